@@ -0,0 +1,68 @@
+"""
+This module hands the terminal it runs in to a game forked by the zygote
+launcher, `python3 run.py --zygote SOCKET`, and waits for the game to end.
+
+It imports as little as possible so it starts faster than run.py. If no
+launcher is listening it runs run.py directly instead.
+"""
+
+import os
+import signal
+import socket
+import struct
+import sys
+
+# Unix socket of the zygote launcher, overridden by the ZYGOTE_SOCKET environment variable
+DEFAULT_SOCKET = '/tmp/nebula-zygote.sock'
+
+
+def receive_int(conn):
+    """
+    Read a 4-byte integer sent by the game.
+
+    Args:
+        conn (socket.socket): The connection to the game.
+
+    Returns:
+        int: The integer, or None if the game closed the connection.
+    """
+    data = b''
+    while len(data) < 4:
+        chunk = conn.recv(4 - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return struct.unpack('!i', data)[0]
+
+
+def main():
+    """
+    Attach to a forked game, falling back to running run.py here.
+    """
+    path = os.environ.get('ZYGOTE_SOCKET', DEFAULT_SOCKET)
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(path)
+    except OSError:  # No launcher, start the game the slow way
+        run_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run.py')
+        os.execv(sys.executable, [sys.executable, run_py] + sys.argv[1:])
+
+    arguments = b'\0'.join(arg.encode('utf-8') for arg in sys.argv[1:])
+    socket.send_fds(conn, [arguments], [0, 1, 2])
+    pid = receive_int(conn)
+    if pid is None:
+        sys.exit(1)
+
+    def forward(signum, frame):
+        os.kill(pid, signum)
+
+    # The terminal signals this process, the game should get them
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, forward)
+    status = receive_int(conn)
+    sys.exit(1 if status is None else status)
+
+
+# Attach to the game
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,567 @@
+"""
+This module benchmarks the game across board sizes, saves the results as a
+JSON baseline and compares later runs against it to flag regressions.
+
+Everything runs offline: the games are headless or played through a
+scripted player, with input and sleeps stubbed out.
+"""
+
+import argparse
+import asyncio
+import builtins
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import run
+
+# Board sizes benchmarked unless chosen on the command line
+SIZES = (5, 10, 50, 200, 1000, 2000)
+
+# Biggest board the scripted interactive game is played on, it renders every turn
+INTERACTIVE_MAX_SIZE = 50
+
+# Share of the cells shot at before late-game guesses are timed
+LATE_GAME = 0.5
+
+# Guesses and shots timed per run of the late-game and shot benchmarks
+TIMED_SHOTS = 2000
+
+# Seconds after which a benchmark is not repeated, big boards are timed once
+SLOW_RUN = 1.0
+
+# Seconds a measurement is timed for at least, small boards are run again and
+# again until then, like timeit's autorange
+MIN_TIMED = 0.2
+
+# Wall-clock seconds after which a measurement stops running a benchmark again,
+# so a short timed part behind a long set-up is not run for minutes
+MAX_WALL = 5.0
+
+# Smallest growth per run, in seconds and in KiB of peak memory, that can be
+# flagged as a regression, smaller changes are noise
+TIME_NOISE_FLOOR = 0.0005
+MEMORY_NOISE_FLOOR = 64
+
+# How much slower than the baseline a benchmark may get before it is flagged
+REGRESSION_THRESHOLD = 1.25
+
+# Seed of every benchmark, so runs are comparable
+SEED = 2024
+
+
+class ScriptedIO:
+    """
+    A player who answers prompts from a script and never waits.
+
+    Messages and frames are written to a buffer so the cost of producing
+    them is measured without a terminal.
+    """
+    def __init__(self, answers=()):
+        """
+        Initialize the player.
+
+        Args:
+            answers (iterable of str, optional): The answers to the prompts, in order.
+        """
+        self.answers = iter(answers)
+        self.buffer = io.StringIO()
+
+    async def ask(self, prompt):
+        """
+        Answer a prompt with the next line of the script.
+
+        Args:
+            prompt (str): The prompt, written to the buffer.
+
+        Returns:
+            str: The scripted answer.
+        """
+        self.buffer.write(prompt)
+        return next(self.answers)
+
+    async def say(self, text):
+        """
+        Write a message to the buffer at once, whatever the text mode.
+
+        Args:
+            text (str): The message, a newline is added.
+        """
+        self.buffer.write(text + '\n')
+
+    async def show(self, text):
+        """
+        Write text to the buffer.
+
+        Args:
+            text (str): The text, a newline is added.
+        """
+        self.buffer.write(text + '\n')
+
+    async def pause(self, seconds):
+        """
+        Carry on without waiting.
+
+        Args:
+            seconds (float): Ignored.
+        """
+
+    def write(self, data):
+        """
+        Write raw terminal output to the buffer.
+
+        Args:
+            data (str): The output.
+        """
+        self.buffer.write(data)
+
+    def flush(self):
+        """
+        Nothing to do, the buffer is never shown.
+        """
+
+    def terminal_size(self):
+        """
+        Get the size of the pretend terminal.
+
+        Returns:
+            os.terminal_size: 80 columns and 24 lines.
+        """
+        return run.os.terminal_size((80, 24))
+
+
+def refuse_input(prompt=''):
+    """
+    Stand in for input(), which a benchmark must never reach.
+
+    Raises:
+        RuntimeError: Always, naming the prompt that was asked.
+    """
+    raise RuntimeError(f"benchmark asked for input: {prompt!r}")
+
+
+def stub_blocking_calls():
+    """
+    Stub out input and sleeps so the benchmarks never wait on a person or a clock.
+    """
+    builtins.input = refuse_input
+    time.sleep = lambda seconds: None
+    run.OUTPUT.mode = 'instant'
+
+
+def fleet_size(size):
+    """
+    Get the spaceships per side benchmarked on a board, one per hundred cells.
+
+    Args:
+        size (int): The size of the board.
+
+    Returns:
+        int: The number of spaceships, at least 5.
+    """
+    return max(5, size * size // 100)
+
+
+def new_game(size, rng, ai='random'):
+    """
+    Set up a headless game with both fleets and the planets placed.
+
+    Args:
+        size (int): The size of the boards.
+        rng (random.Random): The random number generator of the game.
+        ai (str, optional): The TARGETING strategy of both sides.
+
+    Returns:
+        SpaceshipGame: The game, ready for the first shot.
+    """
+    game = run.SpaceshipGame(rng, ai=ai, player_ai=ai, io=ScriptedIO())
+    num_ships = fleet_size(size)
+    player = run.User("Player", size, num_ships, rng, game.io)
+    computer = run.User("Computer", size, num_ships, rng, game.io)
+    for user in (player, computer):
+        game.place_computer_ships(user, num_ships, size)
+        user.board.initialize_planets(size)
+    game.num_ships = num_ships
+    game.engine = run.GameEngine(player, computer)
+    return game
+
+
+def fire_at_player(game, shots):
+    """
+    Fire the computer's random shots at the player's board, keeping the game going.
+
+    Args:
+        game (SpaceshipGame): The game.
+        shots (int): The most shots to fire.
+    """
+    engine = game.engine
+    board = engine.player.board
+    untried = board.untried_cells
+    for _ in range(min(shots, len(untried))):
+        if engine.game_over:
+            break
+        engine.turn = engine.computer
+        engine.fire(*divmod(untried.sample(), board.size))
+
+
+def bench_initialize_planets(size, rng):
+    """
+    Time scattering the planets over an empty board.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the operations done.
+    """
+    board = run.Board(size, rng)
+    start = time.perf_counter()
+    board.initialize_planets(size)
+    return time.perf_counter() - start, 1
+
+
+def bench_place_computer_ships(size, rng):
+    """
+    Time placing the computer's fleet on an empty board.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the operations done.
+    """
+    game = run.SpaceshipGame(rng, io=ScriptedIO())
+    user = run.User("Computer", size, fleet_size(size), rng, game.io)
+    start = time.perf_counter()
+    game.place_computer_ships(user, user.num_ships, size)
+    return time.perf_counter() - start, 1
+
+
+def bench_place_ships_randomly(size, rng):
+    """
+    Time placing the player's fleet at random, as offered at set-up.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the operations done.
+    """
+    user = run.User("Player", size, fleet_size(size), rng, ScriptedIO())
+    start = time.perf_counter()
+    asyncio.run(user.place_ships_randomly())
+    return time.perf_counter() - start, 1
+
+
+def late_guess(ai):
+    """
+    Build a benchmark of a strategy's guesses late in a game.
+
+    Args:
+        ai (str): The TARGETING strategy.
+
+    Returns:
+        callable: The benchmark, taking the board size and a random.Random.
+    """
+    def bench(size, rng):
+        """
+        Time the strategy's guesses once half of the player's board is shot at.
+
+        Args:
+            size (int): The size of the board.
+            rng (random.Random): The random number generator of the run.
+
+        Returns:
+            tuple: The seconds timed and the guesses made.
+        """
+        game = new_game(size, rng, ai)
+        fire_at_player(game, int(size * size * LATE_GAME))
+        engine = game.engine
+        board = engine.player.board
+        game.computer_make_guess(size, board)  # Build the strategy before timing
+        elapsed = 0.0
+        guesses = 0
+        while guesses < TIMED_SHOTS and len(board.untried_cells) > 1 and not engine.game_over:
+            start = time.perf_counter()
+            x_coordinate, y_coordinate = game.computer_make_guess(size, board)
+            elapsed += time.perf_counter() - start
+            guesses += 1
+            engine.turn = engine.computer
+            game.take_shot(x_coordinate, y_coordinate)
+        return elapsed, guesses
+    return bench
+
+
+def bench_shot_resolution(size, rng):
+    """
+    Time the engine resolving shots at cells drawn beforehand, alternating sides.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the shots fired.
+    """
+    game = new_game(size, rng)
+    engine = game.engine
+    cells = {}  # Cells each side fires at, drawn before timing
+    for user in (engine.player, engine.computer):
+        board = user.board
+        pool = board.untried_cells
+        cells[user] = [divmod(pool.draw(), board.size) for _ in range(min(TIMED_SHOTS, len(pool) - 1))]
+    fired = 0
+    start = time.perf_counter()
+    while not engine.game_over:
+        targets = cells[engine.opponent(engine.turn)]
+        if not targets:
+            break
+        engine.fire(*targets.pop())
+        fired += 1
+    return time.perf_counter() - start, fired
+
+
+def bench_display(size, rng):
+    """
+    Time printing the player's whole board.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the operations done.
+    """
+    game = new_game(size, rng)
+    board = game.engine.player.board
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        board.display(hide_ships=False)
+        elapsed = time.perf_counter() - start
+    return elapsed, 1
+
+
+def bench_headless_game(size, rng):
+    """
+    Time a whole computer-vs-computer game with no rendering.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the rounds played.
+    """
+    game = run.SpaceshipGame(rng, io=ScriptedIO())
+    start = time.perf_counter()
+    engine = game.simulate(size, fleet_size(size))
+    return time.perf_counter() - start, engine.rounds_played
+
+
+def bench_interactive_game(size, rng):
+    """
+    Time a whole game played through a scripted player, rendering every turn.
+
+    Args:
+        size (int): The size of the board.
+        rng (random.Random): The random number generator of the run.
+
+    Returns:
+        tuple: The seconds timed and the rounds played, or None above
+            INTERACTIVE_MAX_SIZE.
+    """
+    if size > INTERACTIVE_MAX_SIZE:
+        return None
+    cells = [f"{x_coordinate} {y_coordinate}" for x_coordinate in range(size) for y_coordinate in range(size)]
+    rng.shuffle(cells)
+    answers = ["Bench", str(size), str(fleet_size(size)), "2"] + cells
+    game = run.SpaceshipGame(rng, io=ScriptedIO(answers))
+    start = time.perf_counter()
+    asyncio.run(game.play())
+    return time.perf_counter() - start, game.rounds_played
+
+
+# Benchmarks run by default, by name
+BENCHMARKS = {
+    "initialize_planets": bench_initialize_planets,
+    "place_computer_ships": bench_place_computer_ships,
+    "place_ships_randomly": bench_place_ships_randomly,
+    "late_guess_random": late_guess('random'),
+    "late_guess_hunt": late_guess('hunt'),
+    "shot_resolution": bench_shot_resolution,
+    "display": bench_display,
+    "headless_game": bench_headless_game,
+    "interactive_game": bench_interactive_game,
+}
+
+
+def autorange(benchmark, size):
+    """
+    Run a benchmark until MIN_TIMED seconds are timed, or MAX_WALL pass.
+
+    Every run starts from the same seed, so the runs are alike and their
+    mean is steadier than any single one.
+
+    Args:
+        benchmark (callable): One of BENCHMARKS.
+        size (int): The size of the board.
+
+    Returns:
+        tuple: The mean seconds timed and operations done per run, or None
+            if the size does not apply.
+    """
+    seconds = operations = runs = 0
+    start = time.perf_counter()
+    while seconds < MIN_TIMED and (not runs or time.perf_counter() - start < MAX_WALL):
+        result = benchmark(size, random.Random(SEED))
+        if result is None:
+            return None
+        seconds += result[0]
+        operations += result[1]
+        runs += 1
+    return seconds / runs, operations / runs
+
+
+def measure(benchmark, size, repeats):
+    """
+    Time a benchmark at one board size and trace its peak memory.
+
+    Each repeat is an autorange() and the fastest is kept, but one slower
+    than SLOW_RUN is not repeated. One more run under tracemalloc then
+    measures the peak memory.
+
+    Args:
+        benchmark (callable): Takes the board size and a random.Random and
+            returns the seconds timed and the operations done, or None if
+            the size does not apply.
+        size (int): The size of the board.
+        repeats (int): The number of timed runs.
+
+    Returns:
+        dict: The best mean seconds and operations per run, seconds per
+            operation and peak KiB, or None.
+    """
+    best = None
+    for _ in range(repeats):
+        result = autorange(benchmark, size)
+        if result is None:
+            return None
+        if best is None or result[0] < best[0]:
+            best = result
+        if result[0] > SLOW_RUN:
+            break
+    tracemalloc.start()
+    benchmark(size, random.Random(SEED))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    seconds, operations = best
+    return {"seconds": seconds, "operations": operations,
+            "per_operation": seconds / max(operations, 1), "peak_kib": peak / 1024}
+
+
+def run_benchmarks(names, sizes, repeats):
+    """
+    Run benchmarks at every size, printing each result as it comes.
+
+    Args:
+        names (list of str): The BENCHMARKS to run.
+        sizes (list of int): The board sizes.
+        repeats (int): The number of timed runs per benchmark and size.
+
+    Returns:
+        dict: The run's metadata and a map of benchmark to size to result.
+    """
+    stub_blocking_calls()
+    results = {}
+    for name in names:
+        results[name] = {}
+        for size in sizes:
+            result = measure(BENCHMARKS[name], size, repeats)
+            if result is None:
+                continue
+            results[name][str(size)] = result
+            print(f"{name:22} {size:>5}x{size:<5} {result['seconds'] * 1000:10.3f} ms "
+                  f"{result['per_operation'] * 1e6:12.3f} us/op {result['peak_kib']:12.1f} KiB peak", flush=True)
+    meta = {"python": platform.python_version(), "platform": platform.platform(), "seed": SEED,
+            "repeats": repeats, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    return {"meta": meta, "results": results}
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare a run against a baseline, printing every change.
+
+    Time per operation is compared, so runs of different lengths stay
+    comparable. Peak memory is compared too. Growth under the noise floors
+    is not flagged, whatever its ratio.
+
+    Args:
+        baseline (dict): The baseline run, as saved by run_benchmarks().
+        current (dict): The new run.
+        threshold (float, optional): The ratio to the baseline over which a
+            result is flagged.
+
+    Returns:
+        list of str: The regressions found.
+    """
+    regressions = []
+    for name, sizes in current["results"].items():
+        for size, result in sizes.items():
+            before = baseline["results"].get(name, {}).get(size)
+            if before is None:
+                continue
+            growth = {"time": result["seconds"] - before["seconds"], "memory": result["peak_kib"] - before["peak_kib"]}
+            for key, unit, floor in (("per_operation", "time", TIME_NOISE_FLOOR),
+                                     ("peak_kib", "memory", MEMORY_NOISE_FLOOR)):
+                ratio = result[key] / before[key] if before[key] else 1.0
+                flag = ratio > threshold and growth[unit] >= floor
+                print(f"{name:22} {size:>5} {unit:6} {ratio:6.2f}x" + ("  REGRESSION" if flag else ""))
+                if flag:
+                    regressions.append(f"{name} at {size}x{size}: {unit} {ratio:.2f}x the baseline")
+    return regressions
+
+
+def main():
+    """
+    Run the benchmark suite from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Nebula Battlefront across board sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help=f"board sizes (default: {' '.join(map(str, SIZES))})")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS),
+                        help="benchmarks to run (default: all)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="timed runs per benchmark and size, the fastest is kept (default: 3)")
+    parser.add_argument("--save", metavar="PATH", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="flag regressions against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help=f"slowdown ratio flagged as a regression (default: {REGRESSION_THRESHOLD})")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.only, args.sizes, args.repeats)
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), results, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions")
+
+
+# Run the benchmarks
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,9 @@ function socket() {
 
     this.on('open', function (client) {
 
-        // Spawn terminal
-        client.tty = Pty.spawn('python3', ['run.py'], {
+        // Spawn terminal, attached to a pre-forked game when the zygote launcher is running
+        const args = process.env.ZYGOTE_SOCKET ? ['-S', 'attach.py'] : ['run.py'];
+        client.tty = Pty.spawn('python3', args, {
             name: 'xterm-color',
             cols: 80,
             rows: 24,
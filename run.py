@@ -3,481 +3,3981 @@ This module defines the SpaceshipGame class
 and the main function to run the game.
 """
 
+import argparse
+import array
+import bisect
+import asyncio
+import concurrent.futures
+import gc
+import itertools
+import json
 import os
 import random
+import re
+import select
+import shutil
+import signal
+import socket
+import struct
 import time
+import tracemalloc
+import zlib
 import sys
 
+try:
+    import termios
+    import tty
+except ImportError:  # No termios on Windows, animations there cannot be skipped
+    termios = None
 
-def clear_terminal():
-    """
-    Clear the terminal screen.
-    """
-    # clear terminal see reademe for more info
-    os.system('cls' if os.name == 'nt' else 'clear')
+# Possible outcomes of a single shot
+MISS = 'miss'
+HIT = 'hit'
+SUNK = 'sunk'
+PLANET = 'planet'
 
+# States of a board cell and the symbol each one is displayed with
+CELL_EMPTY, CELL_SHIP, CELL_PLANET, CELL_HIT, CELL_MISS = range(5)
+SYMBOLS = ('🌫', '🚀', '🪐', '💥', 'M')
+SYMBOL_CODES = {symbol: code for code, symbol in enumerate(SYMBOLS)}
 
-def typewriter_effect(text, delay=0.05):
-    """
-    Display text with a typewriter effect.
+# Spaceship lengths a fleet cycles through, the shortest length and the most of
+# a board the fleet may cover, the longest spaceships shrink until it fits
+FLEET_LENGTHS = (5, 4, 3, 3, 2)
+MIN_SHIP_LENGTH = 2
+FLEET_SHARE = 0.5
 
-    Args:
-        text (str): The text to be displayed.
-        delay (float, optional): The delay between printing each character.
+# A run of free cells along a row or column
+FREE_RUN = re.compile(re.escape(bytes([CELL_EMPTY])) + b'+')
 
-    Returns:
-        None
-    """
-    # Typewriter effect see readme for more info
-    for char in text:
-        sys.stdout.write(char)
-        sys.stdout.flush()
-        time.sleep(delay)
-    print()
+# Random placements tried for a spaceship before the free-run index picks one
+PLACEMENT_TRIES = 32
 
+# Share of the hunt-target budget kept in reserve for the work around weighing cells
+HUNT_MARGIN = 0.2
 
-class TitleScreen:
+# Shape HuntTargetAI gives a cell whose open runs it has not measured yet
+UNKNOWN_SHAPE = 0xFFFF
+
+# Statistics a targeting strategy adds up over its moves, held back for a move
+# chosen ahead until it is fired
+STRATEGY_COUNTERS = ('avoided_retries', 'samples_drawn', 'layouts_rejected', 'fallbacks')
+
+# Placements tried per spaceship before a Monte Carlo layout is given up
+LAYOUT_TRIES = 50
+
+# Seconds past the budget the Monte Carlo AI waits for its worker processes
+MONTE_CARLO_GRACE = 0.02
+
+# Share of a cell pool taken or moved before its slots are kept in dense arrays,
+# a dict entry costs about twenty times the eight bytes a cell takes in the arrays
+CELL_POOL_DENSE_SHARE = 1 / 32
+
+# Shortest wait in seconds between two writes of a message to a server player
+STREAM_TICK = 0.05
+
+# Largest board a server player may ask for, set-up runs on the shared event loop
+SERVER_MAX_SIZE = 50
+
+# Terminal rows kept free below the boards for the prompt and messages
+FRAME_MESSAGE_ROWS = 3
+
+# Upper bounds of the histogram buckets for durations in seconds and for sizes in bytes
+SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+BYTES_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Functions listed after a --profile run
+PROFILE_TOP = 25
+
+
+class Histogram:
     """
-    Represents the title screen of the game.
+    Counts observations into buckets by upper bound, like a Prometheus histogram.
     """
-    def __init__(self):
-        # Title text art generated from picsart see readme for more info
-        self.title = r"""
-           _   _      _           _
-          | \ | | ___| |__  _   _| |
-          |  \| |/ _ \ '_ \| | | | |/ _` |
-          | |\  |  __/ |_) | |_| | | (_| |
-          |_| \_|\___|_.__/ \__,_|_|\__,_|
-             ____        _   _   _       __                 _
-            | __ )  __ _| |_| |_| | ___ / _|_ __ ___  _ __ | |_
-            |  _ \ / _` | __| __| |/ _ \ |_| '__/ _ \| '_ \| __|
-            | |_) | (_| | |_| |_| |  __/  _| | | (_) | | | | |_
-            |____/ \__,_|\__|\__|_|\___|_| |_|  \___/|_| |_|\__|
+    def __init__(self, bounds):
         """
-        self.play_game = None
+        Initialize an empty histogram.
 
-    def display(self):
+        Args:
+            bounds (tuple of float): The ascending upper bound of each bucket.
         """
-        Display the title screen and ask if the user wants to play the game.
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # The last bucket holds everything above the bounds
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
         """
-        print(self.title)
-        # Ask user if they want to play the game
-        while True:
-            choice = input("Do you want to play Spaceship Game? (yes/no): ").strip().lower()
-            if choice == "yes":
-                self.play_game = True
-                break
-            elif choice == "no":
-                self.play_game = False
-                break
-            else:
-                typewriter_effect("Invalid choice. Please enter 'yes' or 'no'.")
+        Record an observation.
+
+        Args:
+            value (float): The observed value.
+        """
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
 
 
-class Board:
+class Metrics:
     """
-    Represents the game board.
+    Counters and histograms around the hot paths of a game.
+
+    Disabled by default. Every instrumented call site checks enabled before
+    reading the clock, so a disabled registry costs one attribute lookup.
     """
-    def __init__(self, size):
+    def __init__(self):
         """
-        Initialize a new game board.
-
-        Args:
-            size (int): The size of the square board.
+        Initialize an empty, disabled registry.
         """
-        self.size = size  # Size of the board
-        self.grid = [['🌫' for _ in range(size)] for _ in range(size)]  # initialize the grid
-        self.guessed_locations = set()  # Set to store guessed locations
-        self.planets = set()  # Set to store planet locations
+        self.enabled = False
+        self.counters = {}  # Map of series name to count
+        self.histograms = {}  # Map of series name to Histogram
 
-    def display(self, hide_ships=True):
+    def count(self, name, amount=1):
         """
-        Display the game board.
+        Add to a counter.
 
         Args:
-            hide_ships (bool, optional): Whether to hide the ships on the board. Defaults to True.
+            name (str): The series, with Prometheus labels if any.
+            amount (float, optional): How much to add. Defaults to 1.
         """
-        print('  ' + ' '.join(str(i) for i in range(self.size)))
-        for i, row in enumerate(self.grid):  # Loop through each row
-            row_display = []
-            for j, cell in enumerate(row):  # Loop through each cell in the row
-                if (i, j) in self.guessed_locations:
-                    row_display.append(cell)
-                else:  # Hide ships if hide_ships is True
-                    if hide_ships:  # Hide ships
-                        row_display.append('🌫')
-                    else:  # show ships
-                        row_display.append(cell)
-            print(f"{i} {' '.join(row_display)}")
+        self.counters[name] = self.counters.get(name, 0) + amount
 
-    def update(self, x_coordinate, y_coordinate, symbol):
+    def observe(self, name, value, bounds=SECONDS_BUCKETS):
         """
-        Update the board with the given symbol at the given coordinates.
+        Record an observation in a histogram.
 
         Args:
-            x_coordinate (int): The x-coordinate of the cell to be updated.
-            y_coordinate (int): The y-coordinate of the cell to be updated.
-            symbol (str): The symbol to be placed at the given coordinates.
+            name (str): The series.
+            value (float): The observed value.
+            bounds (tuple of float, optional): The buckets, used when the
+                histogram is created. Defaults to SECONDS_BUCKETS.
         """
-        self.grid[x_coordinate][y_coordinate] = symbol  # Update the grid
-        self.guessed_locations.add((x_coordinate, y_coordinate))  # Add the guessed location
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        histogram.observe(value)
 
-    def initialize_planets(self, num_planets):
+    def to_json(self):
         """
-        Initialize the board with the given number of planets.
+        Render every series as JSON.
 
-        Args:
-            num_planets (int): The number of planets to be placed on the board.
+        Returns:
+            str: The counters, and per histogram its count, sum, max and buckets.
         """
-        while len(self.planets) < num_planets:  # Loop until the number of planets is reached
-            x_coordinate = random.randint(0, self.size - 1)
-            y_coordinate = random.randint(0, self.size - 1)
-            # Check if the coordinates are not already occupied by a planet or spaceship
-            if (x_coordinate, y_coordinate) not in self.planets and self.grid[x_coordinate][y_coordinate] == '🌫':
-                self.planets.add((x_coordinate, y_coordinate))
-                self.grid[x_coordinate][y_coordinate] = '🪐'
+        histograms = {name: {"count": histogram.count, "sum": histogram.sum, "max": histogram.max,
+                             "buckets": {str(bound): count for bound, count
+                                         in zip(histogram.bounds + ("+Inf",), histogram.buckets)}}
+                      for name, histogram in sorted(self.histograms.items())}
+        return json.dumps({"counters": dict(sorted(self.counters.items())), "histograms": histograms}, indent=2)
 
+    def to_prometheus(self):
+        """
+        Render every series in the Prometheus text format.
 
-class Ship:
-    """
-    Represents a spaceship on the board.
-    """
-    def __init__(self, owner, coordinates):
+        Returns:
+            str: The exposition text.
         """
-        Initialize a spaceship.
+        lines = []
+        typed = set()  # Metric names whose TYPE line has been written
+        for name, value in sorted(self.counters.items()):
+            metric = name.partition('{')[0]
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{name} {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            metric, _, labels = name.partition('{')
+            labels = labels.rstrip('}')
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ("+Inf",), histogram.buckets):
+                cumulative += count
+                bucket_labels = f'{labels},le="{bound}"' if labels else f'le="{bound}"'
+                lines.append(f"{metric}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+            lines.append(f"{metric}_count{suffix} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path, form='json'):
+        """
+        Write every series to a file, replacing it atomically.
 
         Args:
-            owner (str): The owner of the spaceship.
-            coordinates (list of tuple): The coordinates occupied by the spaceship.
+            path (str): The file to write.
+            form (str, optional): 'json' or 'prometheus'. Defaults to 'json'.
         """
-        self.owner = owner
-        self.coordinates = coordinates  # List of coordinates occupied by the spaceship
-        self.sunk = False
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as file:
+            file.write(self.to_prometheus() if form == 'prometheus' else self.to_json())
+        os.replace(temporary, path)
 
 
-class User:
+# Metrics of the running process, enabled from the command line
+METRICS = Metrics()
+
+
+class TextOutput:
     """
-    Represents a user in the game.
+    Writes game messages to the terminal in a configurable mode.
+
+    Modes:
+        instant: each message in a single write.
+        word / line: one write per word or line, pausing delay between them.
+        animate: the typewriter effect, one character every delay seconds.
+            Characters are written as they fall due on a timer, so a slow
+            terminal gets them in bigger writes, and any key press shows the
+            rest of the message at once.
     """
-    def __init__(self, name, board_size, num_ships):
+    MODES = ('instant', 'word', 'line', 'animate')
+
+    def __init__(self, mode='animate', delay=0.05, stream=None, input_stream=None):
         """
-        Initialize a user.
+        Initialize the output.
 
         Args:
-            name (str): The name of the user.
-            board_size (int): The size of the game board.
-            num_ships (int): The number of spaceships the user wants to place.
+            mode (str, optional): One of MODES. Defaults to 'animate'.
+            delay (float, optional): Seconds per character, word or line.
+            stream (file, optional): Where to write. Defaults to sys.stdout.
+            input_stream (file, optional): Watched for key presses that skip an
+                animation. Defaults to sys.stdin.
         """
-        self.name = name
-        self.board = Board(board_size)
-        self.ships = []
-        self.num_ships = num_ships
-        self.score = 0
-        self.ships_sunk = 0
-        self.guessed_locations = set()
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown text mode {mode!r}, expected one of {', '.join(self.MODES)}.")
+        self.mode = mode
+        self.delay = delay
+        self.stream = stream or sys.stdout
+        self.input_stream = input_stream or sys.stdin
+
+    def write_block(self, text):
+        """
+        Write text at once, whatever the mode.
 
-    def place_ships(self):
+        Args:
+            text (str): The text to be displayed, a newline is added.
         """
-        Determine how the user wants to place their spaceships and place them accordingly.
+        self.stream.write(text + '\n')
+        self.stream.flush()
+
+    def write_line(self, text, delay=None):
         """
-        typewriter_effect(f"{self.name}, how would you like to place your spaceships?")
-        typewriter_effect("1. Manually choose ship locations")
-        typewriter_effect("2. Have them placed randomly")
+        Write a message in the configured mode.
 
-        while True:  # Loop until the user enters a valid choice
-            choice = input("Enter your choice (1 or 2): ")
-            if choice == "1":
-                self.place_ships_manually()
-                break
-            elif choice == "2":
-                self.place_ships_randomly()
-                break
-            else:
-                typewriter_effect("Invalid choice. Please enter 1 or 2.")
+        Args:
+            text (str): The text to be displayed, a newline is added.
+            delay (float, optional): Overrides the configured delay.
+        """
+        start = time.perf_counter() if METRICS.enabled else None
+        delay = self.delay if delay is None else delay
+        if self.mode == 'instant' or delay <= 0 or not text:
+            self.write_block(text)
+        elif self.mode == 'animate':
+            self._animate(text + '\n', delay)
+        else:
+            pattern = r'\s*\S+\s*|\s+' if self.mode == 'word' else r'[^\n]*\n'
+            for chunk in re.findall(pattern, text + '\n'):
+                self.stream.write(chunk)
+                self.stream.flush()
+                time.sleep(delay)
+        if start is not None:
+            METRICS.observe('nebula_text_seconds', time.perf_counter() - start)
+
+    def _key_pressed(self, timeout):
+        """
+        Wait for a key press for at most timeout seconds.
+
+        Args:
+            timeout (float): Seconds to wait.
 
-    def place_ships_manually(self):
+        Returns:
+            bool: True if a key was pressed, which is read and discarded.
         """
-        Manually place the user's spaceships on the board.
+        try:
+            readable, _, _ = select.select([self.input_stream], [], [], timeout)
+        except (OSError, ValueError):  # Not a selectable stream, just wait
+            time.sleep(timeout)
+            return False
+        if readable:
+            os.read(self.input_stream.fileno(), 1024)
+        return bool(readable)
+
+    def _animate(self, text, delay):
         """
-        for ship_number in range(1, self.num_ships + 1):  # Loop through each ship
-            message = f"Placing {self.name}'s spaceship {ship_number} out of {self.num_ships}"
-            typewriter_effect(message)
-            coordinates = []   # List to store ship coordinates
-            while True:  # Loop until the user enters valid coordinates
-                x_coordinate, y_coordinate = self.get_valid_input()
-                # Check if the coordinates are not already occupied by a planet or spaceship
-                if (x_coordinate, y_coordinate) not in coordinates and self.board.grid[x_coordinate][y_coordinate] == '🌫':
-                    coordinates.append((x_coordinate, y_coordinate))
-                    self.board.grid[x_coordinate][y_coordinate] = '🚀'
-                    self.ships.append(Ship(self.name, coordinates))
+        Write text with a skippable typewriter effect.
+
+        Args:
+            text (str): The text to be displayed.
+            delay (float): Seconds per character.
+        """
+        interactive = termios is not None and self.input_stream.isatty()
+        if interactive:  # Read single key presses without echoing them
+            fd = self.input_stream.fileno()
+            saved = termios.tcgetattr(fd)
+            tty.setcbreak(fd)
+        try:
+            start = time.monotonic()
+            written = 0
+            while written < len(text):
+                due = min(len(text), int((time.monotonic() - start) / delay) + 1)
+                self.stream.write(text[written:due])
+                self.stream.flush()
+                written = due
+                if written == len(text):
                     break
-                elif (x_coordinate, y_coordinate) in coordinates:  # Check if the coordinates are already occupied
-                    typewriter_effect(f"You have already placed spaceship {ship_number} at "
-                          f"({x_coordinate}, {y_coordinate}). Try again.")
-                else:
-                    typewriter_effect("Invalid coordinates or spot already occupied. "
-                          "Please choose valid coordinates.")
+                wait = start + written * delay - time.monotonic()
+                if interactive and self._key_pressed(max(wait, 0)):
+                    self.stream.write(text[written:])  # Skip the rest of the animation
+                    self.stream.flush()
+                    break
+                if not interactive and wait > 0:
+                    time.sleep(wait)
+        finally:
+            if interactive:
+                termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+# Output shared by every message in the game, configured from the command line
+OUTPUT = TextOutput()
+
+
+def typewriter_effect(text, delay=None):
+    """
+    Display text with a typewriter effect.
+
+    The text goes through OUTPUT, so the command line decides whether it is
+    animated, written in chunks or written at once.
+
+    Args:
+        text (str): The text to be displayed.
+        delay (float, optional): The delay between printing each character.
+            Defaults to the delay OUTPUT was configured with.
+
+    Returns:
+        None
+    """
+    # Typewriter effect see readme for more info
+    OUTPUT.write_line(text, delay)
+
+
+class ConsoleIO:
+    """
+    The terminal the game talks to when it is run directly.
 
-    def place_ships_randomly(self):
+    The game awaits every prompt, message and pause so that a server can run
+    many games in one event loop. Here there is only one game, so the calls
+    simply block.
+    """
+    def __init__(self, output=None):
         """
-        Place the user's spaceships randomly on the board.
+        Initialize the console.
+
+        Args:
+            output (TextOutput, optional): Writes the messages. Defaults to OUTPUT.
         """
-        for _ in range(1, self.num_ships + 1):
-            coordinates = []
-            while True:
-                x_coordinate = random.randint(0, self.board.size - 1)
-                y_coordinate = random.randint(0, self.board.size - 1)
-                if (x_coordinate, y_coordinate) not in coordinates and self.board.grid[x_coordinate][y_coordinate] == '🌫':
-                    coordinates.append((x_coordinate, y_coordinate))
-                    self.board.grid[x_coordinate][y_coordinate] = '🚀'
-                    self.ships.append(Ship(self.name, coordinates))
-                    typewriter_effect(f"{self.name}'s spaceship placed at ({x_coordinate}, {y_coordinate})")
-                    break
+        self.output = output or OUTPUT
 
-    def get_valid_input(self):
+    async def ask(self, prompt):
         """
-        Get valid input for coordinates from the user.
+        Prompt the player and wait for a line of input.
+
+        Args:
+            prompt (str): The prompt to show.
 
         Returns:
-            tuple: A tuple containing the x_coordinate and y_coordinate coordinates.
+            str: The line entered, without the newline.
+
+        Raises:
+            EOFError: If the input was closed.
         """
-        while True:  # Loop until the user enters valid coordinates
-            try:  # Check if the user entered valid integers
-                input_str = input(f"{self.name}'s Turn: Enter the X and Y coordinates (eg. 2 3): ")
-                x_coordinate, y_coordinate = map(int, input_str.split())
-                if 0 <= x_coordinate < self.board.size and 0 <= y_coordinate < self.board.size:  # Check if the coordinates are within the board
-                    position = (x_coordinate, y_coordinate)
-                    if position not in self.guessed_locations:  # Check if the user has already guessed this spot
-                        self.guessed_locations.add(position)
-                        return x_coordinate, y_coordinate
-                    else:  # User has already guessed this spot
-                        typewriter_effect(f"You have already used those coordinates. Please Try again, {self.name}.")
-                else:  # Coordinates are not within the board
-                    typewriter_effect("Invalid coordinates. Please enter coordinates within the board.")
-            except ValueError:  # User did not enter valid integers
-                typewriter_effect("Invalid input. Please enter valid numbers for the coordinates.")
+        return input(prompt)
 
+    async def say(self, text):
+        """
+        Show a message in the configured text mode.
 
-class SpaceshipGame:
-    """
-    Represents a game of Spaceship.
-    """
-    def __init__(self):
+        Args:
+            text (str): The message, a newline is added.
         """
-        Initialize the game.
+        self.output.write_line(text)
+
+    async def show(self, text):
         """
-        self.rounds_played = 0
+        Show text at once, whatever the text mode.
 
-    def play(self):
+        Args:
+            text (str): The text, a newline is added.
         """
-        Play the game.
+        self.output.write_block(text)
+
+    async def pause(self, seconds):
         """
-        player_name = input("Enter your name: ")
-        while True:  # Loop until the user enters a valid board size
-            try:
-                board_size = int(input("Enter the board size min size = 5 (5x5): "))
-                if board_size >= 5:  # Check if the board size is at least 5
-                    break
-                else:
-                    typewriter_effect("Board size must be at least 5. Please enter a valid board size.")
-            except ValueError:
-                typewriter_effect("Invalid input. Please enter a valid integer for the board size.")
+        Wait before carrying on.
 
-        while True:  # Loop until the user enters a valid number of spaceships
-            try:  # Check if the user entered a valid integer
-                num_ships = int(input("Enter the number of spaceships you want to place: "))
-                # Check if the number of spaceships is between 5 and 30% of the board size
-                if num_ships >= 5 and num_ships <= (board_size * board_size) * 0.3:
-                    break
-                else:
-                    typewriter_effect("Number of spaceships must be between 5 and 30% of the board size.")
-            except ValueError:
-                typewriter_effect("Invalid input. Please enter a valid number of spaceships.")
+        Args:
+            seconds (float): How long to wait.
+        """
+        time.sleep(seconds)
 
-        player = User(player_name, board_size, num_ships)
-        computer = User("Computer", board_size, num_ships)
+    def write(self, data):
+        """
+        Write raw terminal output, such as a frame of the boards.
 
-        typewriter_effect(f"Welcome to Spaceship, {player_name}!")
+        Args:
+            data (str): The output.
+        """
+        self.output.stream.write(data)
 
-        player.place_ships()  # Place the player's spaceships
-        self.place_computer_ships(computer, num_ships, board_size)  # Place the computer's spaceships
-        player.board.initialize_planets(board_size)   # Initialize planets for the player
-        computer.board.initialize_planets(board_size)  # Initialize planets for the computer
+    def flush(self):
+        """
+        Send what has been written.
+        """
+        self.output.stream.flush()
 
-        # Clear guessed locations after all ships have been placed
-        player.guessed_locations.clear()
-        computer.guessed_locations.clear()
+    def terminal_size(self):
+        """
+        Get the size of the player's terminal.
 
-        while True:  # Loop until the game is over
-            time.sleep(1)
-            clear_terminal()
-            typewriter_effect(f"{player.name}'s Board:")
-            player.board.display(False)
-            typewriter_effect("\nComputer's Board:")
-            computer.board.display(True)
-
-            x_coordinate, y_coordinate = player.get_valid_input()  # Player's Turn
-            self.rounds_played += 1
-
-            hit = False
-            extra_munitions = False
-            for ship in computer.ships:  # Check if the player hit a spaceship
-                for coord in ship.coordinates:
-                    if coord == (x_coordinate, y_coordinate):
-                        hit = True
-                        ship.coordinates.remove(coord)
-                        if not ship.coordinates:  # Check if the spaceship is sunk
-                            ship.sunk = True
-                            player.score += 1
-                            player.ships_sunk += 1
-                            message = f"Spaceship at was found ({x_coordinate}, {y_coordinate})."
-                            typewriter_effect(message)
-                            computer.board.update(x_coordinate, y_coordinate, '💥')
-                            break
-
-            if not hit:  # Check if the player hit a planet
-                for planet in computer.board.planets:
-                    if planet == (x_coordinate, y_coordinate):
-                        extra_munitions = True
-                        message = "Extra munitions found, take another guess!"
-                        typewriter_effect(message)
-                        computer.board.update(x_coordinate, y_coordinate, '🪐')
-                        break
-
-            if not hit and not extra_munitions:  # Player missed
-                message = f"You shot and found nothing at ({x_coordinate}, {y_coordinate})."
-                typewriter_effect(message)
-                computer.board.update(x_coordinate, y_coordinate, 'M')
-
-            if extra_munitions:  # Player gets another turn
-                continue
+        Returns:
+            os.terminal_size: The columns and lines.
+        """
+        return shutil.get_terminal_size((80, 24))
 
-            if all(ship.sunk for ship in computer.ships):  # Check if the player has sunk all the computer's spaceships
-                typewriter_effect(f"{player.name} has sunk {player.score}/{num_ships}")
-                typewriter_effect(f"In {self.rounds_played} rounds. Congratulations!")
-                display_win_art()  # Display win text art
-                break
 
-            x_coordinate, y_coordinate = self.computer_make_guess(player.board.size, player.board)
-            self.rounds_played += 1
-
-            message = f"Computer's Turn: Attempted shot at ({x_coordinate}, {y_coordinate})."  # Computer's Turn
-            typewriter_effect(message)
-
-            hit = False
-            for ship in player.ships:  # Check if the computer hit a spaceship
-                for coord in ship.coordinates:
-                    if coord == (x_coordinate, y_coordinate):  # Check if the computer hit a spaceship
-                        hit = True
-                        ship.coordinates.remove(coord)
-                        if not ship.coordinates:  # Check if the spaceship is sunk
-                            ship.sunk = True
-                            computer.score += 1
-                            message = f"Spaceship at was found ({x_coordinate}, {y_coordinate})."
-                            typewriter_effect(message)
-                            player.board.update(x_coordinate, y_coordinate, '💥')
-                            break
-
-            if not hit:  # Check if the computer hit a planet
-                for planet in player.board.planets:  # Check if the computer hit a planet
-                    if planet == (x_coordinate, y_coordinate):
-                        message = "Extra munitions found, take another guess!"
-                        typewriter_effect(message)
-                        player.board.update(x_coordinate, y_coordinate, '🪐')
-                        break
-
-            if not hit and not extra_munitions:  # Computer missed
-                message = f"Computer shot and found nothing at ({x_coordinate}, {y_coordinate})."
-                typewriter_effect(message)
-                player.board.update(x_coordinate, y_coordinate, 'M')
-
-            if extra_munitions:  # Computer gets another turn
-                continue
+class StreamIO:
+    """
+    A player connected to the game server over a line-based stream.
 
-            if all(ship.sunk for ship in player.ships):  # Check if the computer has sunk all the player's spaceships
-                typewriter_effect(f"Computer has sunk {computer.score}/{num_ships}")
-                typewriter_effect(f"In {self.rounds_played} rounds. Better luck next time!")
-                display_loss_art()  # Display loss text art
-                break
+    Every call awaits the connection, so a slow or idle player only holds up
+    their own game. Messages follow the text mode, sending whatever chunks are
+    due at each wake-up, so a session costs one write and drain per tick
+    rather than per character; they cannot be skipped, since input arrives a
+    line at a time.
+    """
+    def __init__(self, reader, writer, mode='instant', delay=0.05, size=(80, 24)):
+        """
+        Initialize the connection.
 
-    def computer_make_guess(self, board_size, player_board):
+        Args:
+            reader (asyncio.StreamReader): Lines typed by the player.
+            writer (asyncio.StreamWriter): Output to the player.
+            mode (str, optional): One of TextOutput.MODES. Defaults to 'instant'.
+            delay (float, optional): Seconds per character, word or line.
+            size (tuple, optional): Columns and lines of the player's terminal.
         """
-        Generate a random guess for the computer.
+        if mode not in TextOutput.MODES:
+            raise ValueError(f"Unknown text mode {mode!r}, expected one of {', '.join(TextOutput.MODES)}.")
+        self.reader = reader
+        self.writer = writer
+        self.mode = mode
+        self.delay = delay
+        self.size = os.terminal_size(size)
+
+    async def ask(self, prompt):
+        """
+        Prompt the player and wait for a line of input.
 
         Args:
-            board_size (int): The size of the game board.
-            player_board (Board): The player's game board.
+            prompt (str): The prompt to show.
 
         Returns:
-            tuple: A tuple containing the x_coordinate and y_coordinate of the guess.
+            str: The line entered, without the line ending.
+
+        Raises:
+            EOFError: If the player disconnected.
+        """
+        self.write(prompt)
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise EOFError("Player disconnected")
+        return line.decode('utf-8', 'replace').rstrip('\r\n')
+
+    async def say(self, text):
         """
-        while True:  # Loop until the computer makes a valid guess
-            x_coordinate = random.randint(0, board_size - 1)
-            y_coordinate = random.randint(0, board_size - 1)
-            if (x_coordinate, y_coordinate) not in player_board.guessed_locations:
-                player_board.guessed_locations.add((x_coordinate, y_coordinate))
-                return x_coordinate, y_coordinate
+        Show a message in the configured text mode.
 
-    def place_computer_ships(self, computer, num_ships, board_size):
+        Args:
+            text (str): The message, a newline is added.
         """
-        Place the computer's spaceships on the board.
+        start = time.perf_counter() if METRICS.enabled else None
+        if self.mode == 'instant' or self.delay <= 0 or not text:
+            await self.show(text)
+        else:
+            pattern = {'animate': r'.', 'word': r'\s*\S+\s*|\s+', 'line': r'[^\n]*\n'}[self.mode]
+            chunks = re.findall(pattern, text + '\n', re.DOTALL)
+            chunk_start = time.monotonic()
+            written = 0
+            while written < len(chunks):  # Send every chunk due by now, like TextOutput._animate
+                due = min(len(chunks), int((time.monotonic() - chunk_start) / self.delay) + 1)
+                self.write(''.join(chunks[written:due]))
+                await self.writer.drain()
+                written = due
+                if written < len(chunks):
+                    await asyncio.sleep(max(chunk_start + written * self.delay - time.monotonic(), STREAM_TICK))
+        if start is not None:
+            METRICS.observe('nebula_text_seconds', time.perf_counter() - start)
+
+    async def show(self, text):
+        """
+        Show text at once, whatever the text mode.
 
         Args:
-            computer (User): The computer player.
-            num_ships (int): The number of spaceships to place.
-            board_size (int): The size of the game board.
+            text (str): The text, a newline is added.
         """
-        for _ in range(1, num_ships + 1):  # Loop through each ship
-            coordinates = []
-            while True:  # Loop until the computer places a valid spaceship
-                x_coordinate = random.randint(0, board_size - 1)
-                y_coordinate = random.randint(0, board_size - 1)
-                if (x_coordinate, y_coordinate) not in coordinates and computer.board.grid[x_coordinate][y_coordinate] == '🌫':
-                    coordinates.append((x_coordinate, y_coordinate))
-                    computer.board.grid[x_coordinate][y_coordinate] = '🚀'
-                    computer.ships.append(Ship("Computer", coordinates))
-                    break
+        self.write(text + '\n')
+        await self.writer.drain()
 
+    async def pause(self, seconds):
+        """
+        Wait before carrying on, letting the other games run.
 
-def display_win_art():
-    """
-    Display a winning message in ASCII art.
-    """
-    # Win text art generated from picsart see readme for more info
-    win_art = r"""
-     __        ___                       _
-     \ \      / (_)_ __  _ __   ___ _ __| |
-      \ \ /\ / /| | '_ \| '_ \ / _ \ '__| |
-       \ V  V / | | | | | | | |  __/ |  |_|
-        \_/\_/  |_|_| |_|_| |_|\___|_|  (_)
-    """
-    print(win_art)
+        Args:
+            seconds (float): How long to wait.
+        """
+        await asyncio.sleep(seconds)
 
+    def write(self, data):
+        """
+        Queue raw terminal output, sent at the next await.
 
-def display_loss_art():
-    """
-    Display a losing message in ASCII art.
-    """
-    # Win text art generated from picsart see readme for more info
-    loss_art = r"""
-       ____                         ___                   _
-      / ___| __ _ _ __ ___   ___   / _ \__   _____ _ __  | |
+        Args:
+            data (str): The output.
+        """
+        self.writer.write(data.encode('utf-8'))
+
+    def flush(self):
+        """
+        Nothing to do, queued output is sent at the next await.
+        """
+
+    def terminal_size(self):
+        """
+        Get the size of the player's terminal.
+
+        Returns:
+            os.terminal_size: The columns and lines given when connecting.
+        """
+        return self.size
+
+
+class TitleScreen:
+    """
+    Represents the title screen of the game.
+    """
+    def __init__(self):
+        # Title text art generated from picsart see readme for more info
+        self.title = r"""
+           _   _      _           _
+          | \ | | ___| |__  _   _| |
+          |  \| |/ _ \ '_ \| | | | |/ _` |
+          | |\  |  __/ |_) | |_| | | (_| |
+          |_| \_|\___|_.__/ \__,_|_|\__,_|
+             ____        _   _   _       __                 _
+            | __ )  __ _| |_| |_| | ___ / _|_ __ ___  _ __ | |_
+            |  _ \ / _` | __| __| |/ _ \ |_| '__/ _ \| '_ \| __|
+            | |_) | (_| | |_| |_| |  __/  _| | | (_) | | | | |_
+            |____/ \__,_|\__|\__|_|\___|_| |_|  \___/|_| |_|\__|
+        """
+        self.play_game = None
+
+    async def display(self, io=None):
+        """
+        Display the title screen and ask if the user wants to play the game.
+
+        Args:
+            io (ConsoleIO or StreamIO, optional): Where the player is. Defaults to the terminal.
+        """
+        io = io or ConsoleIO()
+        await io.show(self.title)
+        # Ask user if they want to play the game
+        while True:
+            choice = (await io.ask("Do you want to play Spaceship Game? (yes/no): ")).strip().lower()
+            if choice == "yes":
+                self.play_game = True
+                break
+            elif choice == "no":
+                self.play_game = False
+                break
+            else:
+                await io.say("Invalid choice. Please enter 'yes' or 'no'.")
+
+
+class CellPool:
+    """
+    Represents a pool of board cells drawn at random without replacement.
+
+    The pool works like a lazy Fisher-Yates shuffle over the cell numbers
+    0..num_cells-1, so drawing or discarding a cell is O(1). While few cells
+    are taken only the slots whose cell has moved are stored in dicts. Once
+    CELL_POOL_DENSE_SHARE of the cells have moved the slots switch to two
+    dense arrays, which hold the whole shuffle in eight bytes a cell.
+    """
+    def __init__(self, num_cells, rng=None):
+        """
+        Initialize a pool holding every cell of a board.
+
+        Args:
+            num_cells (int): The number of cells on the board.
+            rng (random.Random, optional): The random number generator to draw
+                with. Defaults to the global random module.
+        """
+        self.num_cells = num_cells
+        self.rng = rng or random
+        self.remaining = num_cells  # Slots 0..remaining-1 hold the cells left
+        self._slots = {}  # Map of slot to the cell moved into it
+        self._positions = {}  # Map of moved or taken cell to its slot
+        self._dense = False  # Whether _slots and _positions are full arrays
+        self._dense_after = int(num_cells * CELL_POOL_DENSE_SHARE)
+
+    def __len__(self):
+        return self.remaining
+
+    def __contains__(self, cell):
+        if self._dense:
+            return self._positions[cell] < self.remaining
+        return self._positions.get(cell, cell) < self.remaining
+
+    def _densify(self):
+        """
+        Move the slots from the dicts into dense arrays, the shuffle stays the same.
+        """
+        slots = array.array('I', range(self.num_cells))
+        positions = array.array('I', range(self.num_cells))
+        for slot, cell in self._slots.items():
+            slots[slot] = cell
+        for cell, slot in self._positions.items():
+            positions[cell] = slot
+        self._slots = slots
+        self._positions = positions
+        self._dense = True
+
+    def _take(self, slot):
+        """
+        Remove the cell at the given slot by swapping the last cell into it.
+
+        Args:
+            slot (int): The slot to take the cell from.
+
+        Returns:
+            int: The cell that was removed.
+        """
+        last = self.remaining - 1
+        slots = self._slots
+        positions = self._positions
+        self.remaining = last
+        if self._dense:
+            cell = slots[slot]
+            last_cell = slots[last]
+            slots[slot] = last_cell
+            positions[last_cell] = slot
+            slots[last] = cell  # Park the cell past the end of the pool
+            positions[cell] = last
+            return cell
+        cell = slots.get(slot, slot)
+        if slot != last:
+            last_cell = slots.get(last, last)
+            slots[slot] = last_cell
+            positions[last_cell] = slot
+        slots.pop(last, None)
+        positions[cell] = last  # Park the cell past the end of the pool
+        if len(positions) > self._dense_after:
+            self._densify()
+        return cell
+
+    def draw(self):
+        """
+        Draw a random cell and remove it from the pool.
+
+        Returns:
+            int: The cell drawn, numbered x * size + y.
+        """
+        if not self.remaining:
+            raise IndexError("draw from an empty CellPool")
+        return self._take(self.rng.randrange(self.remaining))
+
+    def sample(self):
+        """
+        Pick a random cell without removing it from the pool.
+
+        Returns:
+            int: The cell picked, numbered x * size + y.
+        """
+        if not self.remaining:
+            raise IndexError("sample from an empty CellPool")
+        slot = self.rng.randrange(self.remaining)
+        if self._dense:
+            return self._slots[slot]
+        return self._slots.get(slot, slot)
+
+    def discard(self, cell):
+        """
+        Remove a cell from the pool if it is still in it.
+
+        Args:
+            cell (int): The cell to remove, numbered x * size + y.
+        """
+        if cell in self:
+            self._take(self._positions[cell] if self._dense else self._positions.get(cell, cell))
+
+
+class FreeRuns:
+    """
+    Represents the runs of free cells along every row and column of a board.
+
+    Lines 0..size-1 are the rows and lines size..2*size-1 the columns. Each
+    line keeps its runs as sorted start and end lists, so the run holding a
+    cell is a bisect away and occupying a cell splits one run in its row and
+    one in its column.
+
+    A Fenwick tree over the lines counts the placements a spaceship of one
+    length has in each line, so a uniformly random legal placement is one
+    descent of the tree and a walk over one line's runs, however crowded the
+    board is. The tree counts one length at a time and is rebuilt when
+    another is asked for; fleets are placed longest first, so that happens
+    once per length. Board.random_ship_cells only builds the index once random
+    tries stop finding room.
+    """
+    def __init__(self, board):
+        """
+        Initialize the runs from the current state of a board.
+
+        Args:
+            board (Board): The board to index.
+        """
+        size = board.size
+        self.size = size
+        self.rng = board.rng
+        self.starts = []  # Per line, the first cell of each free run
+        self.ends = []  # Per line, the cell after the last of each free run
+        for line in range(2 * size):
+            codes = board.cells[line * size:(line + 1) * size] if line < size else board.cells[line - size::size]
+            runs = [match.span() for match in FREE_RUN.finditer(codes)]
+            self.starts.append([start for start, _ in runs])
+            self.ends.append([end for _, end in runs])
+        self.length = None  # Spaceship length the tree counts placements of
+        self.tree = []  # Fenwick tree of the placements per line
+        self.total = 0  # Placements on the whole board
+
+    def _placements(self, line, length):
+        """
+        Count the placements of a spaceship of the given length along a line.
+
+        Args:
+            line (int): The row, or size plus the column.
+            length (int): The length of the spaceship.
+
+        Returns:
+            int: The number of placements.
+        """
+        return sum(max(0, end - start - length + 1) for start, end in zip(self.starts[line], self.ends[line]))
+
+    def _build(self, length):
+        """
+        Build the tree counting the placements of a spaceship of the given length.
+
+        Args:
+            length (int): The length of the spaceship.
+        """
+        lines = 2 * self.size
+        tree = [0] + [self._placements(line, length) for line in range(lines)]
+        self.total = sum(tree)
+        for index in range(1, lines + 1):  # Turn the counts into a Fenwick tree in place
+            parent = index + (index & -index)
+            if parent <= lines:
+                tree[parent] += tree[index]
+        self.tree, self.length = tree, length
+
+    def random_placement(self, length):
+        """
+        Pick a uniformly random legal placement for a spaceship.
+
+        Args:
+            length (int): The length of the spaceship.
+
+        Returns:
+            tuple: The x_coordinate and y_coordinate of its first cell and
+                whether it lies along the row, or None if it fits nowhere.
+        """
+        if length != self.length:
+            self._build(length)
+        if not self.total:
+            return None
+        target = self.rng.randrange(self.total)
+        tree, line, step = self.tree, 0, 1 << (len(self.tree) - 1).bit_length()
+        while step:  # Descend the tree to the line holding the target placement
+            if line + step < len(tree) and tree[line + step] <= target:
+                line += step
+                target -= tree[line]
+            step >>= 1
+        for start, end in zip(self.starts[line], self.ends[line]):  # Then walk that line's runs
+            count = max(0, end - start - length + 1)
+            if target < count:
+                break
+            target -= count
+        if line < self.size:
+            return line, start + target, True
+        return start + target, line - self.size, False
+
+    def _take(self, line, position, count=1):
+        """
+        Remove free cells from the run holding them.
+
+        Args:
+            line (int): The row, or size plus the column.
+            position (int): The first cell's place along the line.
+            count (int, optional): The number of cells, all in the same run.
+        """
+        starts, ends = self.starts[line], self.ends[line]
+        index = bisect.bisect_right(starts, position) - 1
+        start, end = starts[index], ends[index]
+        last = position + count
+        if position == start and last == end:  # The run was these cells alone
+            del starts[index]
+            del ends[index]
+        elif position == start:
+            starts[index] = last
+        elif last == end:
+            ends[index] = position
+        else:  # Split the run around the cells
+            starts.insert(index + 1, last)
+            ends.insert(index, position)
+        length = self.length
+        if length is not None:
+            # Placements left of the cells, plus right of them, minus the whole run's
+            change = (max(0, position - start - length + 1) + max(0, end - last - length + 1)
+                      - max(0, end - start - length + 1))
+            if change:
+                self.total += change
+                tree = self.tree
+                index = line + 1
+                while index < len(tree):
+                    tree[index] += change
+                    index += index & -index
+
+    def occupy(self, x_coordinate, y_coordinate, length=1, horizontal=True):
+        """
+        Mark free cells in a line as taken, in their rows and columns.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the first cell.
+            y_coordinate (int): The y-coordinate of the first cell.
+            length (int, optional): The number of cells.
+            horizontal (bool, optional): Whether the cells run along the row, else down the column.
+        """
+        if horizontal:
+            self._take(x_coordinate, y_coordinate, length)
+            for column in range(y_coordinate, y_coordinate + length):
+                self._take(self.size + column, x_coordinate)
+        else:
+            self._take(self.size + y_coordinate, x_coordinate, length)
+            for row in range(x_coordinate, x_coordinate + length):
+                self._take(row, y_coordinate)
+
+
+class BlockSummary:
+    """
+    Represents a board split into square tiles of block x block cells.
+
+    Each tile counts its guessed cells, hits and afloat spaceship cells. The
+    counters are updated by the Board as cells change, so drawing a minimap
+    costs one lookup per tile whatever the size of the board.
+    """
+    def __init__(self, board, block):
+        """
+        Initialize the summary from the current state of a board.
+
+        Args:
+            board (Board): The board to summarise.
+            block (int): The width and height of a tile in cells.
+        """
+        self.size = board.size
+        self.block = block
+        self.tiles_across = -(-board.size // block)  # Ceiling division
+        num_tiles = self.tiles_across * self.tiles_across
+        self.guessed = [0] * num_tiles
+        self.hits = [0] * num_tiles
+        self.ships = [0] * num_tiles
+        for cell in board.ship_index:
+            self.ships[self.tile_of(cell)] += 1
+        for cell in board.guessed_cells():
+            self.record(cell, CELL_EMPTY, board.cells[cell], True)
+
+    def tile_of(self, cell):
+        """
+        Get the tile a cell belongs to.
+
+        Args:
+            cell (int): The cell, numbered x * size + y.
+
+        Returns:
+            int: The tile, numbered row * tiles_across + column.
+        """
+        x_coordinate, y_coordinate = divmod(cell, self.size)
+        return (x_coordinate // self.block) * self.tiles_across + y_coordinate // self.block
+
+    def record(self, cell, previous, code, newly_guessed):
+        """
+        Update the counters of the tile holding a cell that changed.
+
+        Args:
+            cell (int): The cell, numbered x * size + y.
+            previous (int): The CELL_* code the cell had.
+            code (int): The CELL_* code the cell has now.
+            newly_guessed (bool): Whether the cell was shot at for the first time.
+        """
+        tile = self.tile_of(cell)
+        if newly_guessed:
+            self.guessed[tile] += 1
+        if code == CELL_HIT and previous != CELL_HIT:
+            self.hits[tile] += 1
+        if previous == CELL_SHIP and code != CELL_SHIP:
+            self.ships[tile] -= 1
+        elif code == CELL_SHIP and previous != CELL_SHIP:
+            self.ships[tile] += 1
+
+    def symbol(self, tile_row, tile_column, hide_ships=True):
+        """
+        Get the symbol summarising a tile.
+
+        Args:
+            tile_row (int): The row of the tile.
+            tile_column (int): The column of the tile.
+            hide_ships (bool, optional): Whether to hide afloat spaceships.
+
+        Returns:
+            str: A hit if any cell was hit, else a spaceship if any is afloat
+                and shown, else fog if any cell is unknown, else a miss.
+        """
+        tile = tile_row * self.tiles_across + tile_column
+        rows = min(self.block, self.size - tile_row * self.block)
+        columns = min(self.block, self.size - tile_column * self.block)
+        if self.hits[tile]:
+            return SYMBOLS[CELL_HIT]
+        if not hide_ships and self.ships[tile]:
+            return SYMBOLS[CELL_SHIP]
+        if self.guessed[tile] < rows * columns:
+            return SYMBOLS[CELL_EMPTY]
+        return SYMBOLS[CELL_MISS]
+
+
+class Board:
+    """
+    Represents the game board.
+
+    Cell states are kept in a flat bytearray, one byte per cell in row-major
+    order, and shot-at cells in a bitset. Symbols are only looked up when the
+    board is drawn.
+    """
+    def __init__(self, size, rng=None):
+        """
+        Initialize a new game board.
+
+        Args:
+            size (int): The size of the square board.
+            rng (random.Random, optional): The random number generator used to
+                place objects and draw guesses. Defaults to the global random module.
+        """
+        self.size = size  # Size of the board
+        self.rng = rng or random
+        self.cells = bytearray(size * size)  # One CELL_* code per cell, all CELL_EMPTY
+        self.guessed = bytearray((size * size + 7) // 8)  # Bitset of guessed cells
+        self.num_planets = 0  # Number of planets on the board
+        self.ship_index = {}  # Map of occupied cells to the spaceship there
+        self.ships_remaining = 0  # Number of spaceships on the board not yet sunk
+        self._untried_cells = None  # Pool of cells not yet shot at, built on first use
+        self._free_cells = None  # Pool of cells without a spaceship or planet, built on first use
+        self._free_runs = None  # Runs of free cells along the rows and columns, built on first use
+        self._summaries = {}  # Map of tile size to the BlockSummary kept for minimaps
+        self.last_shot = None  # Coordinates of the last cell shot at, the viewport follows it
+
+    def cell_code(self, x_coordinate, y_coordinate):
+        """
+        Get the state of a cell.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the cell.
+            y_coordinate (int): The y-coordinate of the cell.
+
+        Returns:
+            int: One of the CELL_* codes.
+        """
+        return self.cells[x_coordinate * self.size + y_coordinate]
+
+    def is_free(self, x_coordinate, y_coordinate):
+        """
+        Check whether a cell has no spaceship or planet on it.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the cell.
+            y_coordinate (int): The y-coordinate of the cell.
+
+        Returns:
+            bool: True if the cell is empty.
+        """
+        return self.cells[x_coordinate * self.size + y_coordinate] == CELL_EMPTY
+
+    def is_guessed(self, x_coordinate, y_coordinate):
+        """
+        Check whether a cell has been shot at.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the cell.
+            y_coordinate (int): The y-coordinate of the cell.
+
+        Returns:
+            bool: True if the cell has been shot at.
+        """
+        cell = x_coordinate * self.size + y_coordinate
+        return bool(self.guessed[cell >> 3] & (1 << (cell & 7)))
+
+    def guessed_cells(self):
+        """
+        Yield every cell that has been shot at.
+
+        Yields:
+            int: The cell, numbered x * size + y.
+        """
+        for index in itertools.compress(range(len(self.guessed)), self.guessed):
+            byte = self.guessed[index]
+            while byte:  # Walk the set bits of this byte
+                bit = byte & -byte
+                yield index * 8 + bit.bit_length() - 1
+                byte ^= bit
+
+    @property
+    def untried_cells(self):
+        """
+        CellPool: The cells of this board that have not been shot at yet.
+        """
+        if self._untried_cells is None:
+            self._untried_cells = CellPool(self.size * self.size, self.rng)
+            for cell in self.guessed_cells():
+                self._untried_cells.discard(cell)
+        return self._untried_cells
+
+    @property
+    def free_cells(self):
+        """
+        CellPool: The cells of this board not occupied by a spaceship or planet.
+        """
+        if self._free_cells is None:
+            self._free_cells = CellPool(self.size * self.size, self.rng)
+            for cell in self.ship_index:
+                self._free_cells.discard(cell)
+            cell = self.cells.find(CELL_PLANET)
+            while cell != -1:  # Walk the planets
+                self._free_cells.discard(cell)
+                cell = self.cells.find(CELL_PLANET, cell + 1)
+        return self._free_cells
+
+    @property
+    def free_runs(self):
+        """
+        FreeRuns: The runs of free cells along the rows and columns of this board.
+        """
+        if self._free_runs is None:
+            self._free_runs = FreeRuns(self)
+        return self._free_runs
+
+    def ship_fits(self, x_coordinate, y_coordinate, length, horizontal):
+        """
+        Check whether a spaceship fits on free cells from the given first cell.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the first cell.
+            y_coordinate (int): The y-coordinate of the first cell.
+            length (int): The length of the spaceship.
+            horizontal (bool): Whether it lies along the row, else down the column.
+
+        Returns:
+            bool: True if every cell is on the board and free.
+        """
+        if (y_coordinate if horizontal else x_coordinate) + length > self.size:
+            return False
+        step = 1 if horizontal else self.size
+        start = x_coordinate * self.size + y_coordinate
+        return not any(self.cells[start:start + length * step:step])
+
+    def random_ship_cells(self, length):
+        """
+        Pick uniformly random free cells for a spaceship.
+
+        A few random first cells and directions are tried first, which is all
+        a roomy board needs. Once the board is too crowded for that, the
+        free-run index picks among the legal placements directly. Both draw
+        each legal placement with the same chance.
+
+        Args:
+            length (int): The length of the spaceship.
+
+        Returns:
+            list of tuple: The x_coordinate and y_coordinate of each cell.
+
+        Raises:
+            ValueError: If the spaceship fits nowhere on the board.
+        """
+        num_cells = self.size * self.size
+        for _ in range(PLACEMENT_TRIES):
+            horizontal = self.rng.random() < 0.5
+            x_coordinate, y_coordinate = divmod(self.rng.randrange(num_cells), self.size)
+            if self.ship_fits(x_coordinate, y_coordinate, length, horizontal):
+                break
+        else:  # Too crowded for guessing, look the placement up
+            placement = self.free_runs.random_placement(length)
+            if placement is None:
+                raise ValueError(f"Cannot place a spaceship of length {length} on the {self.size}x{self.size} "
+                                 f"board: no free run is long enough.")
+            x_coordinate, y_coordinate, horizontal = placement
+        if horizontal:
+            return [(x_coordinate, y_coordinate + offset) for offset in range(length)]
+        return [(x_coordinate + offset, y_coordinate) for offset in range(length)]
+
+    def random_free_cells(self, count, what="objects"):
+        """
+        Draw distinct random free cells in one pass, without retries.
+
+        Args:
+            count (int): The number of cells needed.
+            what (str, optional): What the cells are for, used in the error message.
+
+        Returns:
+            list of tuple: The x_coordinate and y_coordinate of each cell.
+
+        Raises:
+            ValueError: If the board does not have enough free cells.
+        """
+        free = self.free_cells
+        if count > len(free):
+            raise ValueError(f"Cannot place {count} {what} on the {self.size}x{self.size} board: "
+                             f"only {len(free)} free cells left.")
+        return [divmod(free.draw(), self.size) for _ in range(count)]
+
+    def display(self, hide_ships=True):
+        """
+        Display the game board.
+
+        Args:
+            hide_ships (bool, optional): Whether to hide the ships on the board. Defaults to True.
+        """
+        start = time.perf_counter() if METRICS.enabled else None
+        text = '\n'.join(self.render_lines(hide_ships))
+        print(text)
+        if start is not None:
+            METRICS.observe('nebula_render_seconds', time.perf_counter() - start)
+            METRICS.observe('nebula_render_bytes', len(text.encode('utf-8')) + 1, BYTES_BUCKETS)
+
+    def render_lines(self, hide_ships=True):
+        """
+        Build the lines that display the game board.
+
+        Args:
+            hide_ships (bool, optional): Whether to hide the ships on the board. Defaults to True.
+
+        Returns:
+            list of str: The header line followed by one line per row.
+        """
+        lines = ['  ' + ' '.join(str(i) for i in range(self.size))]
+        for i in range(self.size):  # Loop through each row
+            row_display = []
+            start = i * self.size
+            for cell in range(start, start + self.size):  # Loop through each cell in the row
+                if hide_ships and not self.guessed[cell >> 3] & (1 << (cell & 7)):  # Hide ships
+                    row_display.append(SYMBOLS[CELL_EMPTY])
+                else:
+                    row_display.append(SYMBOLS[self.cells[cell]])
+            lines.append(f"{i} {' '.join(row_display)}")
+        return lines
+
+    def summary(self, block):
+        """
+        Get the tile counters for the given tile size, building them on first use.
+
+        Args:
+            block (int): The width and height of a tile in cells.
+
+        Returns:
+            BlockSummary: The summary, kept up to date from then on.
+        """
+        if block not in self._summaries:
+            self._summaries[block] = BlockSummary(self, block)
+        return self._summaries[block]
+
+    def render_view(self, hide_ships, rows, columns):
+        """
+        Build the lines that display the board in a window of the given size.
+
+        A board that fits is drawn whole. A larger one is drawn as a viewport
+        centred on the last shot, next to a minimap where each tile stands for
+        a block of cells. Only the visible cells and tiles are looked at.
+
+        Args:
+            hide_ships (bool): Whether to hide the ships on the board.
+            rows (int): The number of lines available.
+            columns (int): The number of terminal columns available.
+
+        Returns:
+            list of str: At most rows lines.
+        """
+        label_width = len(str(self.size - 1)) + 1
+        if self.size + 1 <= rows and label_width + 3 * self.size <= columns:
+            return self.render_lines(hide_ships)
+
+        # Split the width between the viewport and the minimap, 3 columns per cell
+        across = max(1, (columns - label_width - 3) // 6)
+        down = max(1, rows - 1)
+        view_rows, view_columns = min(down, self.size), min(across, self.size)
+        center_x, center_y = self.last_shot or (self.size // 2, self.size // 2)
+        top = min(max(center_x - view_rows // 2, 0), self.size - view_rows)
+        left = min(max(center_y - view_columns // 2, 0), self.size - view_columns)
+
+        block = max(-(-self.size // across), -(-self.size // down))
+        summary = self.summary(block)
+        tiles_down = -(-self.size // block)
+        lines = [f"rows {top}-{top + view_rows - 1}, cols {left}-{left + view_columns - 1} | "
+                 f"map: 1 tile = {block}x{block}"]
+        for offset in range(max(view_rows, tiles_down)):
+            line = ' ' * (label_width + 3 * view_columns)
+            if offset < view_rows:
+                row_display = []
+                start = (top + offset) * self.size + left
+                for cell in range(start, start + view_columns):
+                    if hide_ships and not self.guessed[cell >> 3] & (1 << (cell & 7)):
+                        row_display.append(SYMBOLS[CELL_EMPTY])
+                    else:
+                        row_display.append(SYMBOLS[self.cells[cell]])
+                line = f"{top + offset:>{label_width - 1}} {' '.join(row_display)} "
+            if offset < tiles_down:
+                tiles = (summary.symbol(offset, column, hide_ships) for column in range(summary.tiles_across))
+                line += '| ' + ' '.join(tiles)
+            lines.append(line)
+        return lines
+
+    def update(self, x_coordinate, y_coordinate, symbol):
+        """
+        Update the board with the given symbol at the given coordinates.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the cell to be updated.
+            y_coordinate (int): The y-coordinate of the cell to be updated.
+            symbol (str): The symbol to be placed at the given coordinates.
+        """
+        cell = x_coordinate * self.size + y_coordinate
+        code = SYMBOL_CODES[symbol]
+        for summary in self._summaries.values():
+            summary.record(cell, self.cells[cell], code, not self.guessed[cell >> 3] & (1 << (cell & 7)))
+        self.cells[cell] = code  # Update the grid
+        self.guessed[cell >> 3] |= 1 << (cell & 7)  # Add the guessed location
+        self.last_shot = (x_coordinate, y_coordinate)
+        if self._untried_cells is not None:
+            self._untried_cells.discard(cell)
+
+    def place_ship(self, ship):
+        """
+        Put a spaceship on the board and index its coordinates.
+
+        Args:
+            ship (Ship): The spaceship to be placed.
+        """
+        for x_coordinate, y_coordinate in ship.coordinates:
+            cell = x_coordinate * self.size + y_coordinate
+            for summary in self._summaries.values():
+                summary.record(cell, self.cells[cell], CELL_SHIP, False)
+            self.cells[cell] = CELL_SHIP
+            self.ship_index[cell] = ship
+            if self._free_cells is not None:
+                self._free_cells.discard(cell)
+        if self._free_runs is not None:
+            self._free_runs.occupy(*ship.cells[0], ship.length, ship.horizontal)
+        self.ships_remaining += 1
+
+    def ship_at(self, x_coordinate, y_coordinate):
+        """
+        Get the spaceship occupying the given coordinates.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the cell.
+            y_coordinate (int): The y-coordinate of the cell.
+
+        Returns:
+            Ship: The spaceship at the coordinates, or None if there is none.
+        """
+        return self.ship_index.get(x_coordinate * self.size + y_coordinate)
+
+    def initialize_planets(self, num_planets):
+        """
+        Initialize the board with the given number of planets.
+
+        Args:
+            num_planets (int): The number of planets to be placed on the board.
+
+        Raises:
+            ValueError: If the board does not have enough free cells.
+        """
+        count = max(num_planets - self.num_planets, 0)  # Planets still to be placed
+        for x_coordinate, y_coordinate in self.random_free_cells(count, "planets"):
+            self.cells[x_coordinate * self.size + y_coordinate] = CELL_PLANET
+            if self._free_runs is not None:
+                self._free_runs.occupy(x_coordinate, y_coordinate)
+        self.num_planets += count
+
+
+class Ship:
+    """
+    Represents a spaceship on the board.
+    """
+    def __init__(self, owner, coordinates):
+        """
+        Initialize a spaceship.
+
+        Args:
+            owner (str): The owner of the spaceship.
+            coordinates (list of tuple): The coordinates occupied by the spaceship.
+        """
+        self.owner = owner
+        self.coordinates = coordinates  # List of coordinates occupied by the spaceship
+        self.cells = tuple(coordinates)  # Coordinates it was placed on
+        self.length = len(coordinates)
+        self.remaining = self.length  # Cells not hit yet, the spaceship sinks at 0
+        self.sunk = False
+
+    @property
+    def horizontal(self):
+        """
+        bool: Whether the spaceship lies along a row. A one-cell spaceship counts as horizontal.
+        """
+        return self.length < 2 or self.cells[0][0] == self.cells[1][0]
+
+
+def fleet_lengths(num_ships, board_size):
+    """
+    Get the lengths of a fleet, longest first.
+
+    The fleet cycles through FLEET_LENGTHS, capped at the board size. While it
+    would cover more than FLEET_SHARE of the board, its longest spaceships
+    shrink one cell at a time, down to MIN_SHIP_LENGTH.
+
+    Args:
+        num_ships (int): The number of spaceships.
+        board_size (int): The size of the game board.
+
+    Returns:
+        list of int: The length of each spaceship.
+
+    Raises:
+        ValueError: If the spaceships do not fit even at the shortest length.
+    """
+    counts = {}  # Map of length to the spaceships of that length
+    for index in range(num_ships):
+        length = min(FLEET_LENGTHS[index % len(FLEET_LENGTHS)], board_size)
+        counts[length] = counts.get(length, 0) + 1
+    excess = sum(length * count for length, count in counts.items()) - int(board_size * board_size * FLEET_SHARE)
+    for length in range(max(counts, default=MIN_SHIP_LENGTH), MIN_SHIP_LENGTH, -1):
+        if excess <= 0:
+            break
+        shrunk = min(counts.get(length, 0), excess)  # Each spaceship shrunk frees one cell
+        if shrunk:
+            counts[length] -= shrunk
+            counts[length - 1] = counts.get(length - 1, 0) + shrunk
+            excess -= shrunk
+    if excess > 0:
+        raise ValueError(f"Cannot fit {num_ships} spaceships on the {board_size}x{board_size} board.")
+    return [length for length in sorted(counts, reverse=True) for _ in range(counts[length])]
+
+
+def max_fleet_ships(board_size):
+    """
+    Get the most spaceships that fit on a board at the shortest length.
+
+    Args:
+        board_size (int): The size of the game board.
+
+    Returns:
+        int: The number of spaceships.
+    """
+    return int(board_size * board_size * FLEET_SHARE) // MIN_SHIP_LENGTH
+
+
+class User:
+    """
+    Represents a user in the game.
+    """
+    def __init__(self, name, board_size, num_ships, rng=None, io=None):
+        """
+        Initialize a user.
+
+        Args:
+            name (str): The name of the user.
+            board_size (int): The size of the game board.
+            num_ships (int): The number of spaceships the user wants to place.
+            rng (random.Random, optional): The random number generator for the
+                user's board. Defaults to the global random module.
+            io (ConsoleIO or StreamIO, optional): Where the user is asked for
+                input. Defaults to the terminal.
+        """
+        self.name = name
+        self.io = io or ConsoleIO()
+        self.board = Board(board_size, rng)
+        self.ships = []
+        self.num_ships = num_ships
+        self.score = 0
+        self.ships_sunk = 0
+        self.guessed_locations = set()
+
+    async def place_ships(self):
+        """
+        Determine how the user wants to place their spaceships and place them accordingly.
+        """
+        await self.io.say(f"{self.name}, how would you like to place your spaceships?")
+        await self.io.say("1. Manually choose ship locations")
+        await self.io.say("2. Have them placed randomly")
+
+        while True:  # Loop until the user enters a valid choice
+            choice = await self.io.ask("Enter your choice (1 or 2): ")
+            if choice == "1":
+                await self.place_ships_manually()
+                break
+            elif choice == "2":
+                await self.place_ships_randomly()
+                break
+            else:
+                await self.io.say("Invalid choice. Please enter 1 or 2.")
+
+    async def place_ships_manually(self):
+        """
+        Manually place the user's spaceships on the board.
+
+        Each spaceship is placed by its first cell and a direction: along the
+        row to the right, or down the column.
+        """
+        lengths = fleet_lengths(self.num_ships, self.board.size)
+        for ship_number, length in enumerate(lengths, 1):  # Loop through each ship
+            message = f"Placing {self.name}'s spaceship {ship_number} out of {self.num_ships} (length {length})"
+            await self.io.say(message)
+            while True:  # Loop until the user enters valid coordinates
+                x_coordinate, y_coordinate = await self.get_valid_input()
+                self.guessed_locations.discard((x_coordinate, y_coordinate))  # Checked against the board instead
+                direction = (await self.io.ask("Direction, h (along the row) or v (down the column): ")).strip().lower()
+                if direction not in ("h", "v"):
+                    await self.io.say("Invalid direction. Please enter h or v.")
+                    continue
+                horizontal = direction == "h"
+                # Check the spaceship stays on the board and off planets and other spaceships
+                if self.board.ship_fits(x_coordinate, y_coordinate, length, horizontal):
+                    coordinates = [(x_coordinate, y_coordinate + offset) if horizontal
+                                   else (x_coordinate + offset, y_coordinate) for offset in range(length)]
+                    self.ships.append(Ship(self.name, coordinates))
+                    self.board.place_ship(self.ships[-1])
+                    break
+                await self.io.say(f"A spaceship of length {length} does not fit there. "
+                                  "Please choose valid coordinates.")
+
+    async def place_ships_randomly(self):
+        """
+        Place the user's spaceships randomly on the board.
+        """
+        for length in fleet_lengths(self.num_ships, self.board.size):
+            coordinates = self.board.random_ship_cells(length)
+            self.ships.append(Ship(self.name, coordinates))
+            self.board.place_ship(self.ships[-1])
+            x_coordinate, y_coordinate = coordinates[0]
+            direction = "along the row" if self.ships[-1].horizontal else "down the column"
+            await self.io.say(f"{self.name}'s spaceship of length {length} placed at "
+                              f"({x_coordinate}, {y_coordinate}) {direction}")
+
+    async def get_valid_input(self):
+        """
+        Get valid input for coordinates from the user.
+
+        Returns:
+            tuple: A tuple containing the x_coordinate and y_coordinate coordinates.
+        """
+        while True:  # Loop until the user enters valid coordinates
+            try:  # Check if the user entered valid integers
+                start = time.perf_counter() if METRICS.enabled else None
+                input_str = await self.io.ask(f"{self.name}'s Turn: Enter the X and Y coordinates (eg. 2 3): ")
+                if start is not None:
+                    METRICS.observe('nebula_input_wait_seconds', time.perf_counter() - start)
+                x_coordinate, y_coordinate = map(int, input_str.split())
+                if 0 <= x_coordinate < self.board.size and 0 <= y_coordinate < self.board.size:  # Check if the coordinates are within the board
+                    position = (x_coordinate, y_coordinate)
+                    if position not in self.guessed_locations:  # Check if the user has already guessed this spot
+                        self.guessed_locations.add(position)
+                        return x_coordinate, y_coordinate
+                    else:  # User has already guessed this spot
+                        await self.io.say(f"You have already used those coordinates. Please Try again, {self.name}.")
+                else:  # Coordinates are not within the board
+                    await self.io.say("Invalid coordinates. Please enter coordinates within the board.")
+            except ValueError:  # User did not enter valid integers
+                await self.io.say("Invalid input. Please enter valid numbers for the coordinates.")
+
+
+class ShotOutcome:
+    """
+    Represents the result of a single shot.
+    """
+    def __init__(self, shooter, x_coordinate, y_coordinate, result, game_over=False, ship=None):
+        """
+        Initialize a shot outcome.
+
+        Args:
+            shooter (User): The user who fired the shot.
+            x_coordinate (int): The x-coordinate of the shot.
+            y_coordinate (int): The y-coordinate of the shot.
+            result (str): One of MISS, HIT, SUNK or PLANET.
+            game_over (bool, optional): Whether the shot ended the game.
+            ship (Ship, optional): The spaceship that was sunk, revealed to the shooter.
+        """
+        self.shooter = shooter
+        self.x_coordinate = x_coordinate
+        self.y_coordinate = y_coordinate
+        self.result = result
+        self.game_over = game_over
+        self.ship = ship
+
+    @property
+    def extra_turn(self):
+        """
+        bool: Whether the shooter gets to take another shot.
+        """
+        return self.result == PLANET and not self.game_over
+
+
+class GameEngine:
+    """
+    Headless rules engine for a game between two users.
+
+    The engine never reads input, prints or sleeps, so it can be driven
+    by the terminal front-end or run at machine speed.
+    """
+    def __init__(self, player, computer):
+        """
+        Initialize the engine with two users whose boards are already set up.
+
+        Args:
+            player (User): The user who shoots first.
+            computer (User): The opponent.
+        """
+        self.player = player
+        self.computer = computer
+        self.turn = player  # User whose shot is next
+        self.winner = None
+        self.rounds_played = 0
+
+    @property
+    def game_over(self):
+        """
+        bool: Whether one of the users has sunk all of the other's spaceships.
+        """
+        return self.winner is not None
+
+    def opponent(self, user):
+        """
+        Get the opponent of the given user.
+
+        Args:
+            user (User): One of the two users in the game.
+
+        Returns:
+            User: The other user.
+        """
+        return self.computer if user is self.player else self.player
+
+    def fire(self, x_coordinate, y_coordinate):
+        """
+        Resolve a shot by the user whose turn it is.
+
+        A planet grants the shooter another shot, anything else passes the
+        turn to the opponent.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the shot.
+            y_coordinate (int): The y-coordinate of the shot.
+
+        Returns:
+            ShotOutcome: The outcome of the shot.
+
+        Raises:
+            RuntimeError: If the game is already over.
+            ValueError: If the cell is off the board or was already shot at,
+                in which case nothing changes.
+        """
+        if self.game_over:
+            raise RuntimeError("The game is already over.")
+        shooter = self.turn
+        target = self.opponent(shooter)
+        board = target.board
+        # Check the shot before touching any state, a negative index would wrap around the board
+        if not (0 <= x_coordinate < board.size and 0 <= y_coordinate < board.size):
+            raise ValueError(f"({x_coordinate}, {y_coordinate}) is off the {board.size}x{board.size} board.")
+        if board.is_guessed(x_coordinate, y_coordinate):
+            raise ValueError(f"({x_coordinate}, {y_coordinate}) has already been shot at.")
+        start = time.perf_counter() if METRICS.enabled else None
+        self.rounds_played += 1
+
+        ship = board.ship_index.pop(x_coordinate * board.size + y_coordinate, None)
+        if ship is not None:  # The shot hit a spaceship
+            ship.remaining -= 1
+            result = HIT
+            if not ship.remaining:  # Check if the spaceship is sunk
+                ship.sunk = True
+                board.ships_remaining -= 1
+                shooter.score += 1
+                shooter.ships_sunk += 1
+                result = SUNK
+            board.update(x_coordinate, y_coordinate, '💥')
+        elif board.cell_code(x_coordinate, y_coordinate) == CELL_PLANET:  # The shot found a planet
+            result = PLANET
+            board.update(x_coordinate, y_coordinate, '🪐')
+        else:
+            result = MISS
+            board.update(x_coordinate, y_coordinate, 'M')
+
+        if result == SUNK and board.ships_remaining == 0:
+            self.winner = shooter
+        outcome = ShotOutcome(shooter, x_coordinate, y_coordinate, result, self.game_over,
+                              ship if result == SUNK else None)
+        if not outcome.game_over and not outcome.extra_turn:  # Pass the turn to the opponent
+            self.turn = target
+        if start is not None:
+            METRICS.observe('nebula_shot_seconds', time.perf_counter() - start)
+            METRICS.count(f'nebula_shots_total{{result="{result}"}}')
+        return outcome
+
+
+class RandomTargeting:
+    """
+    Computer opponent that fires at a random cell it has not tried yet.
+    """
+    name = 'random'
+    options = ()  # Command line options the strategy takes
+    timed = False  # Whether moves depend on a time budget, so a seed does not replay them exactly
+
+    def __init__(self, board, fleet, rng=None):
+        """
+        Initialize the strategy.
+
+        Args:
+            board (Board): The board being fired at.
+            fleet (list of int): The lengths of the spaceships on the board.
+            rng (random.Random, optional): Unused, the board's pool draws the cells.
+        """
+        self.board = board
+        self.fleet = fleet
+        self.avoided_retries = 0  # Expected retries saved by drawing guesses from a pool
+        self.decision_times = []  # Seconds taken by each choose()
+
+    def choose(self):
+        """
+        Pick the next cell to fire at.
+
+        The guess is picked from the cells not yet shot at, so it never has to
+        retry. It stays in the pool until the shot lands, so a guess that is
+        never fired costs nothing. The retries the old rejection-sampling loop
+        would have needed on average are added to avoided_retries.
+
+        Returns:
+            tuple: The x_coordinate and y_coordinate of the guess.
+        """
+        start = time.perf_counter()
+        untried = self.board.untried_cells
+        # Rejection sampling needs num_cells / untried draws on average per guess
+        self.avoided_retries += untried.num_cells / len(untried) - 1
+        cell = untried.sample()
+        self.decision_times.append(time.perf_counter() - start)
+        return divmod(cell, self.board.size)
+
+    def observe(self, outcome):
+        """
+        Learn from the outcome of a shot at the board.
+
+        Args:
+            outcome (ShotOutcome): The outcome of the shot.
+        """
+
+
+class HuntTargetAI:
+    """
+    Computer opponent that fires where the remaining spaceships most likely are.
+
+    The likelihood of a cell is the number of ways the spaceships still afloat
+    could be laid across it over cells not yet ruled out. It only depends on
+    the cell's shape, how far the open cells run from it each way up to one
+    ship length, so the heatmap keeps a shape per cell, measured on first use
+    and kept for the whole game. A shot only changes the shapes through its
+    own row and column, so it forgets those within one ship length of it.
+    Sinking a spaceship leaves every shape alone and only re-weighs the few
+    hundred shapes there are.
+
+    While no hit is outstanding the AI hunts: it weighs a random sample of
+    untried cells and fires at the likeliest, so on a big board it fires at
+    a likely cell rather than the likeliest of all. Once it has hit a
+    spaceship that is still afloat it targets: it fires next to the hits,
+    where the most placements run through them. Both phases stop at the time
+    budget, so a move costs the same on any board size.
+    """
+    name = 'hunt'
+    options = ('budget',)
+    timed = True
+
+    def __init__(self, board, fleet, rng=None, budget=0.005, samples=64):
+        """
+        Initialize the strategy.
+
+        Args:
+            board (Board): The board being fired at.
+            fleet (list of int): The lengths of the spaceships on the board.
+            rng (random.Random, optional): Unused, the board's pool samples the cells.
+            budget (float, optional): Seconds allowed per move. Defaults to 5 ms.
+            samples (int, optional): Untried cells weighed per hunting move.
+        """
+        self.board = board
+        self.size = board.size
+        self.budget = budget
+        self.samples = samples
+        self.afloat = {}  # Map of spaceship length to how many are still afloat
+        for length in fleet:
+            self.afloat[length] = self.afloat.get(length, 0) + 1
+        self.reach = max(fleet, default=1) - 1  # How far a placement through a cell can extend
+        self.unsunk_hits = set()  # Cells hit on spaceships still afloat
+        self._shapes = array.array('H', [UNKNOWN_SHAPE]) * (self.size * self.size)  # Open runs per cell
+        self._weights = {}  # Map of shape to its likelihood with the spaceships afloat now
+        self.decision_times = []  # Seconds taken by each choose()
+
+    def _open_run(self, cell, step, limit, allow_hits):
+        """
+        Count the open cells next to a cell in one direction, up to the reach.
+
+        Args:
+            cell (int): The cell to start from.
+            step (int): The cell offset of one move: +-1 along a row, +-size along a column.
+            limit (int): The most moves possible before leaving the board.
+            allow_hits (bool): Whether hits on afloat spaceships count as open.
+
+        Returns:
+            int: The number of open cells.
+        """
+        guessed = self.board.guessed
+        run = 0
+        for _ in range(min(self.reach, limit)):
+            cell += step
+            if guessed[cell >> 3] & (1 << (cell & 7)) and not (allow_hits and cell in self.unsunk_hits):
+                break
+            run += 1
+        return run
+
+    def density(self, cell):
+        """
+        Count the placements of afloat spaceships across an untried cell.
+
+        Args:
+            cell (int): The cell, numbered x * size + y.
+
+        Returns:
+            int: The number of placements.
+        """
+        shape = self._shapes[cell]
+        if shape == UNKNOWN_SHAPE:  # Measure the open runs, each at most reach long
+            x_coordinate, y_coordinate = divmod(cell, self.size)
+            shape = 0
+            for step, limit in ((-1, y_coordinate), (1, self.size - 1 - y_coordinate),
+                                (-self.size, x_coordinate), (self.size, self.size - 1 - x_coordinate)):
+                shape = shape * (self.reach + 1) + self._open_run(cell, step, limit, False)
+            self._shapes[cell] = shape
+        weight = self._weights.get(shape)
+        if weight is None:
+            weight = self._weigh(shape)
+            self._weights[shape] = weight
+        return weight
+
+    def _weigh(self, shape):
+        """
+        Count the placements of afloat spaceships across a cell of the given shape.
+
+        Args:
+            shape (int): The open runs left, right, up and down of the cell,
+                as digits in base reach + 1.
+
+        Returns:
+            int: The number of placements.
+        """
+        shape, down = divmod(shape, self.reach + 1)
+        shape, up = divmod(shape, self.reach + 1)
+        left, right = divmod(shape, self.reach + 1)
+        total = 0
+        for length, count in self.afloat.items():
+            if length == 1:
+                total += count
+                continue
+            for before, after in ((left, right), (up, down)):  # Windows of this length through the cell
+                total += count * max(0, min(before, length - 1) + min(after, length - 1) - length + 2)
+        return total
+
+    def _target_score(self, cell):
+        """
+        Count the placements of afloat spaceships across a cell and an outstanding hit.
+
+        Args:
+            cell (int): The untried cell, numbered x * size + y.
+
+        Returns:
+            int: The number of placements.
+        """
+        x_coordinate, y_coordinate = divmod(cell, self.size)
+        total = 0
+        for step, before, after in ((1, y_coordinate, self.size - 1 - y_coordinate),
+                                    (self.size, x_coordinate, self.size - 1 - x_coordinate)):
+            back = self._open_run(cell, -step, before, True)
+            ahead = self._open_run(cell, step, after, True)
+            for length, count in self.afloat.items():
+                for start in range(-min(back, length - 1), 1):  # Windows through the cell
+                    if start + length - 1 > ahead:
+                        continue
+                    window = (cell + offset * step for offset in range(start, start + length))
+                    if any(covered in self.unsunk_hits for covered in window):
+                        total += count
+        return total
+
+    def choose(self):
+        """
+        Pick the next cell to fire at within the time budget.
+
+        Returns:
+            tuple: The x_coordinate and y_coordinate of the guess.
+        """
+        start = time.perf_counter()
+        deadline = start + self.budget * (1 - HUNT_MARGIN)
+        cell = self._target(deadline) if self.unsunk_hits else None
+        if cell is None:
+            cell = self._hunt(deadline)
+        self.decision_times.append(time.perf_counter() - start)
+        return divmod(cell, self.size)
+
+    def _hunt(self, deadline):
+        """
+        Fire at the likeliest of a sample of untried cells.
+
+        Args:
+            deadline (float): The time.perf_counter() value to stop weighing cells at.
+
+        Returns:
+            int: The chosen cell.
+        """
+        untried = self.board.untried_cells
+        best, best_density = None, -1
+        now = time.perf_counter()
+        cost = 0.0  # Seconds the last cell took to weigh
+        for _ in range(min(self.samples, len(untried))):
+            # Stop before a cell that would likely overrun the deadline, but always weigh one
+            if best is not None and now + cost > deadline:
+                break
+            cell = untried.sample()
+            density = self.density(cell)
+            if density > best_density:
+                best, best_density = cell, density
+            cost = time.perf_counter() - now
+            now += cost
+        return best
+
+    def _target(self, deadline):
+        """
+        Fire next to the outstanding hits, where most placements run through them.
+
+        Args:
+            deadline (float): The time.perf_counter() value to stop weighing cells at.
+
+        Returns:
+            int: The chosen cell, or None if no untried cell next to a hit was
+            found before the deadline.
+        """
+        guessed = self.board.guessed
+        best, best_score = None, -1
+        cost = 0.0  # Seconds the last hit took to score around
+        for hit in self.unsunk_hits:
+            # Stop before a hit that would likely overrun the deadline, hunting then picks the cell
+            now = time.perf_counter()
+            if now + cost > deadline:
+                break
+            x_coordinate, y_coordinate = divmod(hit, self.size)
+            neighbours = []
+            if x_coordinate > 0:
+                neighbours.append(hit - self.size)
+            if x_coordinate < self.size - 1:
+                neighbours.append(hit + self.size)
+            if y_coordinate > 0:
+                neighbours.append(hit - 1)
+            if y_coordinate < self.size - 1:
+                neighbours.append(hit + 1)
+            for cell in neighbours:
+                if guessed[cell >> 3] & (1 << (cell & 7)):
+                    continue
+                score = self._target_score(cell)
+                if score > best_score:
+                    best, best_score = cell, score
+            cost = time.perf_counter() - now
+        return best
+
+    def observe(self, outcome):
+        """
+        Learn from the outcome of a shot at the board.
+
+        Args:
+            outcome (ShotOutcome): The outcome of the shot.
+        """
+        cell = outcome.x_coordinate * self.size + outcome.y_coordinate
+        if outcome.result == SUNK:
+            for x_coordinate, y_coordinate in outcome.ship.cells:
+                self.unsunk_hits.discard(x_coordinate * self.size + y_coordinate)
+            self.afloat[outcome.ship.length] -= 1
+            if not self.afloat[outcome.ship.length]:
+                del self.afloat[outcome.ship.length]
+            self._weights.clear()  # The fleet changed, the shapes are weighed again
+        elif outcome.result == HIT:
+            self.unsunk_hits.add(cell)
+        # Only the shapes along this cell's row and column have changed
+        shapes = self._shapes
+        shapes[cell] = UNKNOWN_SHAPE
+        x_coordinate, y_coordinate = divmod(cell, self.size)
+        for distance in range(1, self.reach + 1):
+            if y_coordinate - distance >= 0:
+                shapes[cell - distance] = UNKNOWN_SHAPE
+            if y_coordinate + distance < self.size:
+                shapes[cell + distance] = UNKNOWN_SHAPE
+            if x_coordinate - distance >= 0:
+                shapes[cell - distance * self.size] = UNKNOWN_SHAPE
+            if x_coordinate + distance < self.size:
+                shapes[cell + distance * self.size] = UNKNOWN_SHAPE
+
+
+def sample_fleet_layouts(size, guessed, unsunk_hits, lengths, seconds, max_samples, seed):
+    """
+    Lay the afloat spaceships at random until a deadline, counting the cells they cover.
+
+    A layout is kept when no spaceship overlaps another or a cell that has
+    been ruled out, and every outstanding hit lies under a spaceship. A
+    spaceship is anchored on an uncovered hit while one remains, so layouts
+    near the hits are found quickly. Runs in the worker processes of the
+    Monte Carlo AI, so it takes plain values only.
+
+    Args:
+        size (int): The size of the board.
+        guessed (bytes): The board's guessed-cell bitset.
+        unsunk_hits (tuple of int): Cells hit on spaceships still afloat.
+        lengths (tuple of int): The lengths of the spaceships still afloat.
+        seconds (float): How long to sample for.
+        max_samples (int): Stop early after keeping this many layouts.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        tuple: The map of untried cell to the layouts covering it, the number
+            of layouts kept and the number rejected.
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + seconds
+    hits = set(unsunk_hits)
+    lengths = sorted(lengths, reverse=True)  # The longest spaceships are the hardest to fit
+    counts = {}
+    kept = rejected = 0
+    while kept < max_samples and time.perf_counter() < deadline:
+        used = set()
+        uncovered = list(hits)
+        for length in lengths:
+            for _ in range(LAYOUT_TRIES):
+                horizontal = rng.random() < 0.5
+                step = 1 if horizontal else size
+                if uncovered:  # Put the spaceship across a hit nothing covers yet
+                    anchor_x, anchor_y = divmod(rng.choice(uncovered), size)
+                    offset = rng.randrange(length)
+                    x_coordinate = anchor_x if horizontal else anchor_x - offset
+                    y_coordinate = anchor_y - offset if horizontal else anchor_y
+                    if x_coordinate < 0 or y_coordinate < 0:
+                        continue
+                else:
+                    x_coordinate = rng.randrange(size if horizontal else size - length + 1)
+                    y_coordinate = rng.randrange(size - length + 1 if horizontal else size)
+                if (y_coordinate if horizontal else x_coordinate) + length > size:
+                    continue
+                start = x_coordinate * size + y_coordinate
+                cells = range(start, start + length * step, step)
+                if all(cell not in used and (cell in hits or not guessed[cell >> 3] & (1 << (cell & 7)))
+                       for cell in cells):
+                    used.update(cells)
+                    uncovered = [hit for hit in uncovered if hit not in used]
+                    break
+            else:  # The spaceship did not fit anywhere it was tried
+                break
+        else:
+            if not uncovered:
+                kept += 1
+                for cell in used:
+                    if cell not in hits:
+                        counts[cell] = counts.get(cell, 0) + 1
+                continue
+        rejected += 1
+    return counts, kept, rejected
+
+
+class MonteCarloAI:
+    """
+    Computer opponent that fires at the cell most sampled layouts put a spaceship on.
+
+    Each move lays the afloat spaceships across the board at random, over and
+    over, keeping the layouts that agree with every shot seen so far: nothing
+    on a miss, a known planet or a sunk spaceship, and something on every hit
+    that has not sunk yet. The untried cell covered most often is the most
+    likely to hold a spaceship. Hidden planets are not sampled: every kept
+    layout covers the same number of untried cells, so the planets spread
+    over what is left in the same number of ways for every layout and do not
+    change which cell is likeliest.
+
+    Sampling is anytime. It stops at the time budget and fires at the best
+    cell found so far, and falls back to HuntTargetAI if no layout was kept.
+    With workers, extra processes sample alongside this one and their counts
+    are added up at the deadline; a worker that misses it is left out.
+    """
+    name = 'montecarlo'
+    options = ('budget', 'workers')
+    timed = True
+
+    def __init__(self, board, fleet, rng=None, budget=0.05, workers=0, samples=20000):
+        """
+        Initialize the strategy.
+
+        Args:
+            board (Board): The board being fired at.
+            fleet (list of int): The lengths of the spaceships on the board.
+            rng (random.Random, optional): Seeds the sampling. Defaults to the
+                global random module.
+            budget (float, optional): Seconds allowed per move. Defaults to 50 ms.
+            workers (int, optional): Extra processes sampling each move. Defaults to 0.
+            samples (int, optional): Layouts per process after which a move stops early.
+        """
+        self.board = board
+        self.size = board.size
+        self.rng = rng or random
+        self.budget = budget
+        self.workers = workers
+        self.samples = samples
+        self.fallback = HuntTargetAI(board, fleet, rng, budget=budget)  # Also tracks the hits and fleet
+        self._executor = None  # Process pool, started on the first move that needs it
+        self.decision_times = []  # Seconds taken by each choose()
+        self.samples_drawn = 0  # Layouts kept over all moves
+        self.layouts_rejected = 0  # Layouts that disagreed with the shots seen
+        self.fallbacks = 0  # Moves where no layout was kept
+
+    def choose(self):
+        """
+        Pick the next cell to fire at within the time budget.
+
+        Returns:
+            tuple: The x_coordinate and y_coordinate of the guess.
+        """
+        start = time.perf_counter()
+        lengths = tuple(length for length, count in self.fallback.afloat.items() for _ in range(count))
+        knowledge = (self.size, bytes(self.board.guessed), tuple(self.fallback.unsunk_hits), lengths)
+        futures = []
+        if self.workers > 0:
+            if self._executor is None:
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self._executor.submit(sample_fleet_layouts, *knowledge, self.budget, self.samples,
+                                             self.rng.getrandbits(32))
+                       for _ in range(self.workers)]
+        counts, kept, rejected = sample_fleet_layouts(*knowledge, self.budget, self.samples,
+                                                      self.rng.getrandbits(32))
+        for future in futures:
+            try:
+                timeout = max(0.0, start + self.budget - time.perf_counter()) + MONTE_CARLO_GRACE
+                worker_counts, worker_kept, worker_rejected = future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                future.cancel()  # Too late for this move
+                continue
+            for cell, count in worker_counts.items():
+                counts[cell] = counts.get(cell, 0) + count
+            kept += worker_kept
+            rejected += worker_rejected
+        self.samples_drawn += kept
+        self.layouts_rejected += rejected
+
+        if counts:
+            cell = max(counts, key=counts.get)
+            self.decision_times.append(time.perf_counter() - start)
+            return divmod(cell, self.size)
+        self.fallbacks += 1
+        x_coordinate, y_coordinate = self.fallback.choose()
+        self.fallback.decision_times.clear()  # Timed here instead
+        self.decision_times.append(time.perf_counter() - start)
+        return x_coordinate, y_coordinate
+
+    def observe(self, outcome):
+        """
+        Learn from the outcome of a shot at the board.
+
+        Args:
+            outcome (ShotOutcome): The outcome of the shot.
+        """
+        self.fallback.observe(outcome)
+
+    def samples_per_second(self):
+        """
+        Get the layouts kept per second of move time.
+
+        Returns:
+            float: Layouts per second, 0 before the first move.
+        """
+        elapsed = sum(self.decision_times)
+        return self.samples_drawn / elapsed if elapsed else 0.0
+
+    def close(self):
+        """
+        Stop the worker processes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+# Computer opponents selectable from the command line
+TARGETING = {strategy.name: strategy for strategy in (RandomTargeting, HuntTargetAI, MonteCarloAI)}
+
+
+class TerminalRenderer:
+    """
+    Draws the game boards with ANSI escape codes, resending only what changed.
+
+    The boards are kept at the top of the screen and messages scroll in the
+    rows below them. Each frame is compared with the last one drawn and only
+    the rows that differ are rewritten, addressed with the cursor, in a single
+    buffered write. Rows are the unit of change because emoji are not the same
+    width in every terminal, so the column of a single cell is not reliable.
+    """
+    def __init__(self, stream=None):
+        """
+        Initialize the renderer.
+
+        Args:
+            stream (file, ConsoleIO or StreamIO, optional): Where to write the
+                frames. Defaults to sys.stdout.
+        """
+        self.stream = stream or sys.stdout
+        self.last_frame = None  # Lines drawn in the last frame, None forces a full redraw
+        self.frames = 0
+        self.last_frame_bytes = 0  # Bytes written for the last frame
+        self.total_bytes = 0  # Bytes written for all frames
+        self.total_full_bytes = 0  # Bytes a full clear and redraw of every frame would have cost
+
+    def render(self, lines):
+        """
+        Draw a frame and leave the cursor in the cleared message area below it.
+
+        Args:
+            lines (list of str): The lines of the frame.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        start = time.perf_counter() if METRICS.enabled else None
+        height = self.terminal_size().lines
+        full_redraw = '\x1b[r\x1b[H\x1b[2J' + '\n'.join(lines) + '\n'
+        if len(lines) + 2 > height:  # No room for a fixed frame, redraw everything
+            data = full_redraw
+            self.last_frame = None
+        else:
+            buffer = []
+            if self.last_frame is None or len(self.last_frame) != len(lines):
+                # Clear the screen and keep messages scrolling below the frame
+                buffer.append(f'\x1b[r\x1b[2J\x1b[{len(lines) + 1};{height}r')
+                self.last_frame = [None] * len(lines)
+            for row, line in enumerate(lines):
+                if line != self.last_frame[row]:
+                    buffer.append(f'\x1b[{row + 1};1H{line}\x1b[K')
+            buffer.append(f'\x1b[{len(lines) + 1};1H\x1b[J')  # Clear the message area
+            data = ''.join(buffer)
+            self.last_frame = list(lines)
+
+        self.stream.write(data)
+        self.stream.flush()
+        if start is not None:
+            METRICS.observe('nebula_render_seconds', time.perf_counter() - start)
+            METRICS.observe('nebula_render_bytes', len(data.encode('utf-8')), BYTES_BUCKETS)
+        self.frames += 1
+        self.last_frame_bytes = len(data.encode('utf-8'))
+        self.total_bytes += self.last_frame_bytes
+        self.total_full_bytes += len(full_redraw.encode('utf-8'))
+        return self.last_frame_bytes
+
+    def terminal_size(self):
+        """
+        Get the size of the terminal the frames are drawn on.
+
+        Returns:
+            os.terminal_size: The columns and lines.
+        """
+        if hasattr(self.stream, 'terminal_size'):
+            return self.stream.terminal_size()
+        return shutil.get_terminal_size((80, 24))
+
+    def close(self):
+        """
+        Release the scrolling region so later output uses the whole screen.
+        """
+        if self.last_frame is not None:
+            self.stream.write('\x1b7\x1b[r\x1b8')  # Resetting the region homes the cursor, so save it
+            self.stream.flush()
+            self.last_frame = None
+
+    def stats(self):
+        """
+        Summarise the bytes written per frame.
+
+        Returns:
+            str: A one-line report of frames drawn and bytes written.
+        """
+        frames = max(self.frames, 1)
+        return (f"Rendered {self.frames} frames in {self.total_bytes} bytes "
+                f"({self.total_bytes / frames:.0f} bytes/turn, a full redraw every turn "
+                f"would have been {self.total_full_bytes / frames:.0f} bytes/turn)")
+
+
+# Header of a saved game: magic, format version, flags, board size, spaceships per
+# side, rounds played and whose turn is next. The player's name and both boards follow.
+SNAPSHOT_HEADER = struct.Struct('!4sBBIIIB')
+SNAPSHOT_MAGIC = b'NBSV'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_VERSIONS = (1, 2)  # Versions restore() reads, version 1 only had one-cell spaceships
+SNAPSHOT_COMPRESSED = 1  # Flag: everything after the header is zlib-compressed
+
+# Per board: score and spaceships sunk by its owner, planets on the board
+SNAPSHOT_SIDE = struct.Struct('!III')
+
+# Per board since version 2: the number of spaceships, then each one's first cell
+# and its length, with SNAPSHOT_DOWN set if it lies down a column
+SNAPSHOT_FLEET = struct.Struct('!I')
+SNAPSHOT_SHIP = struct.Struct('!IB')
+SNAPSHOT_DOWN = 0x80
+
+# Saved cell code of a planet that has been shot at, the other codes are the CELL_* codes.
+# Hits and misses are always shot at and nothing else is, so no guessed bitset is saved.
+SNAPSHOT_FOUND_PLANET = 5
+
+# Byte translation tables for packing and unpacking boards
+HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+LOW_NIBBLE = bytes(value & 15 for value in range(256))
+SNAPSHOT_GUESSED = bytes(int(value in (CELL_HIT, CELL_MISS, SNAPSHOT_FOUND_PLANET)) for value in range(256))
+SNAPSHOT_CELLS = bytes(CELL_PLANET if value == SNAPSHOT_FOUND_PLANET else value for value in range(256))
+
+
+def pack_nibbles(codes):
+    """
+    Pack values below 16 two to a byte, the first one in the high nibble.
+
+    Args:
+        codes (bytes): The values.
+
+    Returns:
+        bytes: The packed values, padded with a zero nibble to a whole byte.
+    """
+    if len(codes) % 2:
+        codes = bytes(codes) + b'\0'
+    # Shifting the whole number moves every value into its byte's high nibble
+    packed = (int.from_bytes(codes[0::2], 'big') << 4) | int.from_bytes(codes[1::2], 'big')
+    return packed.to_bytes(len(codes) // 2, 'big')
+
+
+def unpack_nibbles(data, count):
+    """
+    Unpack values packed by pack_nibbles().
+
+    Args:
+        data (bytes): The packed values.
+        count (int): The number of values.
+
+    Returns:
+        bytearray: The values, one per byte.
+    """
+    codes = bytearray(len(data) * 2)
+    codes[0::2] = data.translate(HIGH_NIBBLE)
+    codes[1::2] = data.translate(LOW_NIBBLE)
+    del codes[count:]
+    return codes
+
+
+def pack_bits(flags):
+    """
+    Pack one byte per bit, each 0 or 1, into a bitset laid out like Board.guessed.
+
+    Args:
+        flags (bytes): The bits.
+
+    Returns:
+        bytearray: The bitset.
+    """
+    flags = bytes(flags) + bytes(-len(flags) % 8)
+    total = 0
+    for bit in range(8):
+        total |= int.from_bytes(flags[bit::8], 'big') << bit
+    return bytearray(total.to_bytes(len(flags) // 8, 'big'))
+
+
+def pack_board(board):
+    """
+    Encode a board's cells and shot-at cells at four bits per cell.
+
+    Args:
+        board (Board): The board.
+
+    Returns:
+        bytes: The packed cells.
+    """
+    codes = bytearray(board.cells)
+    cell = codes.find(CELL_PLANET)
+    while cell != -1:  # Walk the planets, marking the ones shot at
+        if board.guessed[cell >> 3] & (1 << (cell & 7)):
+            codes[cell] = SNAPSHOT_FOUND_PLANET
+        cell = codes.find(CELL_PLANET, cell + 1)
+    return pack_nibbles(codes)
+
+
+def pack_fleet(user):
+    """
+    Encode where a user's spaceships lie, five bytes per spaceship.
+
+    Args:
+        user (User): The user.
+
+    Returns:
+        bytes: The number of spaceships, then each one's first cell and length.
+    """
+    size = user.board.size
+    records = [SNAPSHOT_FLEET.pack(len(user.ships))]
+    for ship in user.ships:
+        x_coordinate, y_coordinate = ship.cells[0]
+        records.append(SNAPSHOT_SHIP.pack(x_coordinate * size + y_coordinate,
+                                          ship.length | (0 if ship.horizontal else SNAPSHOT_DOWN)))
+    return b''.join(records)
+
+
+def unpack_board(user, data, num_planets, fleet=None):
+    """
+    Restore a user's board and spaceships from cells packed by pack_board().
+
+    With a fleet packed by pack_fleet(), each spaceship gets back its cells:
+    the unhit ones stay afloat and it is sunk once none are left. Without
+    one, as in version 1 snapshots, spaceships are one cell each: every unhit
+    spaceship cell becomes a spaceship afloat and every hit cell one that
+    was sunk.
+
+    Args:
+        user (User): The user, with an empty board of the right size.
+        data (bytes): The packed cells.
+        num_planets (int): The number of planets on the board.
+        fleet (list of tuple, optional): The first cell, length and direction
+            of each spaceship, as SNAPSHOT_SHIP records.
+
+    Raises:
+        ValueError: If a cell holds an unknown code or a spaceship does not
+            lie on spaceship cells.
+    """
+    board = user.board
+    size = board.size
+    codes = unpack_nibbles(data, size * size)
+    if max(codes, default=0) > SNAPSHOT_FOUND_PLANET:
+        raise ValueError("Snapshot holds an unknown cell code.")
+    board.cells = codes.translate(SNAPSHOT_CELLS)
+    board.guessed = pack_bits(codes.translate(SNAPSHOT_GUESSED))
+    board.num_planets = num_planets
+    if fleet is not None:
+        for start, shape in fleet:
+            length, step = shape & ~SNAPSHOT_DOWN, size if shape & SNAPSHOT_DOWN else 1
+            x_coordinate, y_coordinate = divmod(start, size)
+            if not length or start >= size * size or \
+                    (x_coordinate if step == size else y_coordinate) + length > size:
+                raise ValueError("Snapshot holds a spaceship off the board.")
+            cells = range(start, start + length * step, step)
+            ship = Ship(user.name, [divmod(cell, size) for cell in cells])
+            for cell in cells:
+                if board.cells[cell] == CELL_SHIP and cell not in board.ship_index:
+                    board.ship_index[cell] = ship
+                elif board.cells[cell] == CELL_HIT:
+                    ship.remaining -= 1
+                else:
+                    raise ValueError("Snapshot holds a spaceship that is not on spaceship cells.")
+            if ship.remaining:
+                board.ships_remaining += 1
+            else:
+                ship.sunk = True
+            user.ships.append(ship)
+        return
+    for code in (CELL_SHIP, CELL_HIT):
+        cell = board.cells.find(code)
+        while cell != -1:  # Walk the spaceships
+            ship = Ship(user.name, [divmod(cell, size)])
+            if code == CELL_SHIP:
+                board.place_ship(ship)
+            else:
+                ship.remaining = 0
+                ship.sunk = True
+            user.ships.append(ship)
+            cell = board.cells.find(code, cell + 1)
+
+
+# Header of a move log: magic and format version
+MOVE_LOG_HEADER = struct.Struct('!4sB')
+MOVE_LOG_MAGIC = b'NBLG'
+MOVE_LOG_VERSION = 1
+
+# Every entry of a move log: kind, turn, x, y, shooter (0 player, 1 computer), outcome
+# and the length of the payload after it, a snapshot for checkpoints and nothing for shots
+MOVE_RECORD = struct.Struct('!BIIIBBI')
+MOVE_SHOT, MOVE_CHECKPOINT = range(2)
+OUTCOMES = (MISS, HIT, SUNK, PLANET)
+SHOOTERS = ("Player", "Computer")
+
+# Entry of a move log's index file: turn and file offset of a checkpoint
+MOVE_INDEX = struct.Struct('!QQ')
+
+# Turns between the checkpoints of a move log
+CHECKPOINT_INTERVAL = 100
+
+
+class MoveLog:
+    """
+    Append-only log of every shot in a game, with periodic checkpoints.
+
+    Each shot is one fixed-width record. Every checkpoint_interval turns, and
+    when logging starts, a snapshot of the game is embedded after a record of
+    its own, and its turn and offset are appended to a fixed-width index file
+    next to the log, path + '.idx'. Finding the game at any turn is then a
+    binary search of the index and a replay of at most one interval of shots.
+    """
+    def __init__(self, path, checkpoint_interval=CHECKPOINT_INTERVAL, append=False):
+        """
+        Open a log, writing its header if it is new.
+
+        A log holds one game, so a new game empties the log and its index.
+        Only a resumed game appends, its turns carry on where the log stopped
+        and the index stays sorted for the binary search.
+
+        Args:
+            path (str): The log file.
+            checkpoint_interval (int, optional): Turns between checkpoints.
+            append (bool, optional): Whether to carry on the game already in the log.
+        """
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        mode = 'ab' if append else 'wb'
+        self.file = open(path, mode)
+        if self.file.tell() == 0:
+            self.file.write(MOVE_LOG_HEADER.pack(MOVE_LOG_MAGIC, MOVE_LOG_VERSION))
+        self.index = open(path + '.idx', mode)
+
+    def checkpoint(self, game):
+        """
+        Embed a snapshot of the game and index it.
+
+        Args:
+            game (SpaceshipGame): The game, between turns.
+        """
+        snapshot = game.snapshot()
+        offset = self.file.tell()
+        self.file.write(MOVE_RECORD.pack(MOVE_CHECKPOINT, game.rounds_played, 0, 0, 0, 0, len(snapshot)))
+        self.file.write(snapshot)
+        self.file.flush()
+        # Indexed only once it is in the log, so the index never points past the end
+        self.index.write(MOVE_INDEX.pack(game.rounds_played, offset))
+        self.index.flush()
+
+    def record(self, outcome, game):
+        """
+        Append a shot, then a checkpoint if one is due.
+
+        Args:
+            outcome (ShotOutcome): The outcome of the shot.
+            game (SpaceshipGame): The game the shot was fired in.
+        """
+        shooter = int(outcome.shooter is game.engine.computer)
+        self.file.write(MOVE_RECORD.pack(MOVE_SHOT, game.rounds_played, outcome.x_coordinate,
+                                         outcome.y_coordinate, shooter, OUTCOMES.index(outcome.result), 0))
+        self.file.flush()
+        if not outcome.game_over and game.rounds_played % self.checkpoint_interval == 0:
+            self.checkpoint(game)
+
+    def close(self):
+        """
+        Close the log and its index.
+        """
+        self.file.close()
+        self.index.close()
+
+
+def read_move_log_entries(file):
+    """
+    Stream the entries of a move log from the current position.
+
+    Args:
+        file (file): The log, opened in binary mode.
+
+    Yields:
+        tuple: The kind, turn, x, y, shooter, outcome and payload length of
+            each entry, with the file positioned at its payload. A torn last
+            entry is ignored.
+    """
+    while True:
+        record = file.read(MOVE_RECORD.size)
+        if len(record) < MOVE_RECORD.size:
+            return
+        entry = MOVE_RECORD.unpack(record)
+        end = file.tell() + entry[-1]
+        yield entry
+        file.seek(end)  # Skip the payload, whether or not it was read
+
+
+def open_move_log(path):
+    """
+    Open a move log for reading and check its header.
+
+    Args:
+        path (str): The log file.
+
+    Returns:
+        file: The log, positioned at its first entry.
+
+    Raises:
+        ValueError: If the file is not a move log this version can read.
+    """
+    file = open(path, 'rb')
+    header = file.read(MOVE_LOG_HEADER.size)
+    if len(header) < MOVE_LOG_HEADER.size or MOVE_LOG_HEADER.unpack(header) != (MOVE_LOG_MAGIC, MOVE_LOG_VERSION):
+        file.close()
+        raise ValueError(f"{path} is not a Nebula Battlefront move log.")
+    return file
+
+
+def replay_moves(path):
+    """
+    Stream the shots of a move log without loading the whole file.
+
+    Args:
+        path (str): The log file.
+
+    Yields:
+        tuple: The turn, the shooter ("Player" or "Computer"), x, y and outcome of each shot.
+    """
+    with open_move_log(path) as file:
+        for kind, turn, x_coordinate, y_coordinate, shooter, outcome, _ in read_move_log_entries(file):
+            if kind == MOVE_SHOT:
+                yield turn, SHOOTERS[shooter], x_coordinate, y_coordinate, OUTCOMES[outcome]
+
+
+def find_checkpoint(path, turn):
+    """
+    Binary search a move log's index for the last checkpoint at or before a turn.
+
+    Args:
+        path (str): The log file, its index is path + '.idx'.
+        turn (int): The turn.
+
+    Returns:
+        tuple: The turn and offset of the checkpoint, or None if there is none.
+    """
+    with open(path + '.idx', 'rb') as index:
+        low, high = 0, os.fstat(index.fileno()).st_size // MOVE_INDEX.size
+        while low < high:
+            middle = (low + high) // 2
+            index.seek(middle * MOVE_INDEX.size)
+            checkpoint_turn, _ = MOVE_INDEX.unpack(index.read(MOVE_INDEX.size))
+            if checkpoint_turn <= turn:
+                low = middle + 1
+            else:
+                high = middle
+        if not low:
+            return None
+        index.seek((low - 1) * MOVE_INDEX.size)
+        return MOVE_INDEX.unpack(index.read(MOVE_INDEX.size))
+
+
+def load_move_log(path, turn):
+    """
+    Rebuild a logged game as it stood after a turn.
+
+    Restores the checkpoint found by find_checkpoint(), or the first one in
+    the log if the index is missing, and fires the shots logged after it.
+
+    Args:
+        path (str): The log file.
+        turn (int): The turn, 0 for the game as it was set up.
+
+    Returns:
+        SpaceshipGame: The game, at the turn or at the end of the log if it is shorter.
+
+    Raises:
+        ValueError: If the log has no checkpoint at or before the turn, or its
+            shots do not follow from it.
+    """
+    try:
+        checkpoint = find_checkpoint(path, turn)
+    except FileNotFoundError:  # No index, start from the first checkpoint
+        checkpoint = None
+    game = SpaceshipGame()
+    with open_move_log(path) as file:
+        if checkpoint is not None:
+            file.seek(checkpoint[1])
+        for kind, entry_turn, x_coordinate, y_coordinate, shooter, _, length in read_move_log_entries(file):
+            if entry_turn > turn:
+                break
+            if kind == MOVE_CHECKPOINT:  # Also where a resumed game picked up again
+                game.restore(file.read(length))
+                continue
+            engine = game.engine
+            if engine is None:
+                raise ValueError(f"{path} has no checkpoint to start turn {turn} from.")
+            if engine.game_over or entry_turn != engine.rounds_played + 1 or \
+                    (engine.turn is engine.computer) != bool(shooter):
+                raise ValueError(f"{path} does not follow on at turn {entry_turn}.")
+            engine.fire(x_coordinate, y_coordinate)
+    if game.engine is None:
+        raise ValueError(f"{path} has no checkpoint to start turn {turn} from.")
+    return game
+
+
+class SpaceshipGame:
+    """
+    Represents a game of Spaceship.
+    """
+    def __init__(self, rng=None, renderer=None, ai='random', player_ai='random', ai_options=None, io=None,
+                 save_path=None, log_path=None, speculate=True, max_board_size=None):
+        """
+        Initialize the game.
+
+        Args:
+            rng (random.Random, optional): The random number generator for the
+                whole game, so it can be replayed from a seed. Defaults to the
+                global random module.
+            renderer (TerminalRenderer, optional): Draws the boards during play().
+            ai (str, optional): The TARGETING strategy of the computer.
+            player_ai (str, optional): The TARGETING strategy that plays for the
+                player in simulated games.
+            ai_options (dict, optional): Options such as budget and workers, each
+                passed to the strategies that take it.
+            io (ConsoleIO or StreamIO, optional): Where the player of play() is.
+                Defaults to the terminal.
+            save_path (str, optional): Where play() saves the game after every turn.
+            log_path (str, optional): The MoveLog every shot is appended to.
+            speculate (bool, optional): Whether play() chooses the computer's
+                next shot while the player is typing. Defaults to True.
+            max_board_size (int, optional): The largest board the player may
+                ask for, which also caps the spaceships. Defaults to no limit.
+        """
+        self.rng = rng or random
+        self.io = io or ConsoleIO()
+        self.save_path = save_path
+        self.log_path = log_path
+        self.move_log = None  # Opened once the boards are set up
+        self.num_ships = 0  # Spaceships per side, known once the game is set up
+        self.renderer = renderer or TerminalRenderer(self.io)
+        self.engine = None  # Rules engine, created once the boards are set up
+        self.ai = ai
+        self.player_ai = player_ai
+        self.ai_options = ai_options or {}
+        self.strategies = {}  # Map of board being fired at to the strategy firing at it
+        self.shots_at = {}  # Map of board to the shots observed at it, the version speculation checks
+        self.speculate = speculate
+        self.max_board_size = max_board_size
+        self.speculation = None  # Board, version and future of the computer's move being chosen ahead
+        self.speculations_used = 0  # Moves chosen while the player typed and then fired
+        self.speculations_discarded = 0  # Moves chosen ahead that went stale or unused
+        self.speculation_wait = 0.0  # Seconds the computer's turns still waited for a move chosen ahead
+
+    @property
+    def avoided_retries(self):
+        """
+        float: Expected retries saved by drawing random guesses from a pool.
+        """
+        return sum(getattr(strategy, 'avoided_retries', 0) for strategy in self.strategies.values())
+
+    @property
+    def rounds_played(self):
+        """
+        int: The number of shots fired so far.
+        """
+        return self.engine.rounds_played if self.engine else 0
+
+    async def play(self, resume=None):
+        """
+        Play the game.
+
+        Args:
+            resume (bytes, optional): A snapshot to carry on from instead of setting up a new game.
+        """
+        io = self.io
+        if resume is not None:
+            player, computer = self.restore(resume)
+            await io.say(f"Welcome back, {player.name}! Resuming after {self.rounds_played} rounds.")
+        else:
+            player, computer = await self.set_up()
+        self.start_move_log(append=resume is not None)
+
+        while True:  # Loop until the game is over
+            if self.engine.turn is player:  # Player's Turn
+                if self.speculate:  # Choose the computer's reply while the player is typing
+                    self.start_speculation(player.board)
+                await io.pause(1)
+                self.renderer.render(self.frame_lines(player, computer))
+                x_coordinate, y_coordinate = await player.get_valid_input()
+            else:  # Computer's Turn
+                x_coordinate, y_coordinate = await self.computer_move(player.board)
+                message = f"Computer's Turn: Attempted shot at ({x_coordinate}, {y_coordinate})."
+                await io.say(message)
+
+            outcome = self.take_shot(x_coordinate, y_coordinate)
+            await self.report_outcome(outcome)
+            if outcome.game_over:
+                break
+            if self.save_path is not None:  # Checkpoint, a restart carries on from here
+                self.save(self.save_path)
+
+        if self.save_path is not None and os.path.exists(self.save_path):
+            os.remove(self.save_path)  # Nothing left to resume
+        await self.drop_speculation()
+        self.close_strategies()
+        self.stop_move_log()
+        self.renderer.close()
+        winner = self.engine.winner
+        await io.say(f"{winner.name} has sunk {winner.score}/{self.num_ships}")
+        if winner is player:  # Check if the player has sunk all the computer's spaceships
+            await io.say(f"In {self.rounds_played} rounds. Congratulations!")
+            await display_win_art(io)  # Display win text art
+        else:
+            await io.say(f"In {self.rounds_played} rounds. Better luck next time!")
+            await display_loss_art(io)  # Display loss text art
+
+    async def set_up(self):
+        """
+        Ask the player for the game settings and place both fleets and the planets.
+
+        Returns:
+            tuple: The player and the computer.
+        """
+        io = self.io
+        player_name = await io.ask("Enter your name: ")
+        max_size = self.max_board_size
+        while True:  # Loop until the user enters a valid board size
+            try:
+                board_size = int(await io.ask("Enter the board size min size = 5 (5x5): "))
+                if board_size >= 5 and (max_size is None or board_size <= max_size):  # Check the board size
+                    break
+                elif board_size >= 5:
+                    await io.say(f"Board size must be at most {max_size}. Please enter a valid board size.")
+                else:
+                    await io.say("Board size must be at least 5. Please enter a valid board size.")
+            except ValueError:
+                await io.say("Invalid input. Please enter a valid integer for the board size.")
+
+        while True:  # Loop until the user enters a valid number of spaceships
+            try:  # Check if the user entered a valid integer
+                num_ships = int(await io.ask("Enter the number of spaceships you want to place: "))
+                # Check if the number of spaceships is between 5 and as many as fit on the board
+                if num_ships >= 5 and num_ships <= max_fleet_ships(board_size):
+                    break
+                else:
+                    await io.say(f"Number of spaceships must be between 5 and {max_fleet_ships(board_size)}.")
+            except ValueError:
+                await io.say("Invalid input. Please enter a valid number of spaceships.")
+
+        player = User(player_name, board_size, num_ships, self.rng, io)
+        computer = User("Computer", board_size, num_ships, self.rng, io)
+
+        await io.say(f"Welcome to Spaceship, {player_name}!")
+
+        await player.place_ships()  # Place the player's spaceships
+        self.place_computer_ships(computer, num_ships, board_size)  # Place the computer's spaceships
+        player.board.initialize_planets(board_size)   # Initialize planets for the player
+        computer.board.initialize_planets(board_size)  # Initialize planets for the computer
+
+        # Clear guessed locations after all ships have been placed
+        player.guessed_locations.clear()
+        computer.guessed_locations.clear()
+
+        self.num_ships = num_ships
+        self.engine = GameEngine(player, computer)
+        return player, computer
+
+    def snapshot(self):
+        """
+        Encode the game in progress as a compact binary snapshot.
+
+        Returns:
+            bytes: The header, then the player's name and both boards at four
+                bits per cell with where their spaceships lie, zlib-compressed
+                when that is smaller.
+        """
+        engine = self.engine
+        size = engine.player.board.size
+        name = engine.player.name.encode('utf-8')
+        body = [struct.pack('!H', len(name)), name]
+        for user in (engine.player, engine.computer):
+            body.append(SNAPSHOT_SIDE.pack(user.score, user.ships_sunk, user.board.num_planets))
+            body.append(pack_board(user.board))
+            body.append(pack_fleet(user))
+        body = b''.join(body)
+        flags = 0
+        compressed = zlib.compress(body, 1)
+        if len(compressed) < len(body):
+            body, flags = compressed, SNAPSHOT_COMPRESSED
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, size, self.num_ships,
+                                      engine.rounds_played, int(engine.turn is engine.computer))
+        return header + body
+
+    def restore(self, data):
+        """
+        Rebuild the users and the engine from a snapshot made by snapshot().
+
+        The strategies are rebuilt from the boards when they are first used.
+
+        Args:
+            data (bytes): The snapshot.
+
+        Returns:
+            tuple: The player and the computer.
+
+        Raises:
+            ValueError: If the data is not a snapshot this version can read.
+        """
+        try:
+            magic, version, flags, size, num_ships, rounds_played, turn = SNAPSHOT_HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("Snapshot is truncated.") from None
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a Nebula Battlefront snapshot.")
+        if version not in SNAPSHOT_VERSIONS:
+            raise ValueError(f"Snapshot version {version} is not supported.")
+        body = memoryview(data)[SNAPSHOT_HEADER.size:]
+        try:
+            if flags & SNAPSHOT_COMPRESSED:
+                body = memoryview(zlib.decompress(body))
+            (name_length,) = struct.unpack_from('!H', body)
+            offset = 2 + name_length
+            name = bytes(body[2:offset]).decode('utf-8')
+            board_bytes = (size * size + 1) // 2
+            users = []
+            for user_name in (name, "Computer"):
+                score, ships_sunk, num_planets = SNAPSHOT_SIDE.unpack_from(body, offset)
+                offset += SNAPSHOT_SIDE.size
+                cells = bytes(body[offset:offset + board_bytes])
+                if len(cells) != board_bytes:
+                    raise ValueError("Snapshot is truncated.")
+                offset += board_bytes
+                fleet = None  # Version 1 spaceships are rebuilt from the cells
+                if version >= 2:
+                    (count,) = SNAPSHOT_FLEET.unpack_from(body, offset)
+                    offset += SNAPSHOT_FLEET.size
+                    fleet = list(SNAPSHOT_SHIP.iter_unpack(body[offset:offset + count * SNAPSHOT_SHIP.size]))
+                    if len(fleet) != count:
+                        raise ValueError("Snapshot is truncated.")
+                    offset += count * SNAPSHOT_SHIP.size
+                user = User(user_name, size, num_ships, self.rng, self.io)
+                unpack_board(user, cells, num_planets, fleet)
+                user.score, user.ships_sunk = score, ships_sunk
+                users.append(user)
+        except (struct.error, zlib.error, UnicodeDecodeError):
+            raise ValueError("Snapshot is corrupt.") from None
+
+        player, computer = users
+        # The player may not fire at a cell of the computer's board twice
+        player.guessed_locations = {divmod(cell, size) for cell in computer.board.guessed_cells()}
+        self.num_ships = num_ships
+        self.engine = GameEngine(player, computer)
+        self.engine.rounds_played = rounds_played
+        self.engine.turn = computer if turn else player
+        self.strategies = {}
+        return player, computer
+
+    def save(self, path):
+        """
+        Save a snapshot of the game, replacing the file atomically.
+
+        Args:
+            path (str): The file to save to.
+        """
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(self.snapshot())
+        os.replace(temporary, path)  # A crash mid-write leaves the last snapshot intact
+
+    def frame_lines(self, player, computer):
+        """
+        Build the frame showing both boards, sized to the terminal.
+
+        Args:
+            player (User): The human player, whose spaceships are shown.
+            computer (User): The computer, whose spaceships are hidden.
+
+        Returns:
+            list of str: The lines of the frame.
+        """
+        columns, height = self.renderer.terminal_size()
+        # Leave room for the prompt and messages, then split the rest between the boards
+        rows = max((height - FRAME_MESSAGE_ROWS - 1) // 2 - 1, 2)
+        return ([f"{player.name}'s Board:"] + player.board.render_view(False, rows, columns)
+                + ["", "Computer's Board:"] + computer.board.render_view(True, rows, columns))
+
+    async def report_outcome(self, outcome):
+        """
+        Tell the player what a shot found.
+
+        Args:
+            outcome (ShotOutcome): The outcome returned by the engine.
+        """
+        x_coordinate, y_coordinate = outcome.x_coordinate, outcome.y_coordinate
+        if outcome.result == SUNK:
+            await self.io.say(f"Spaceship sunk at ({x_coordinate}, {y_coordinate}), "
+                              f"all {outcome.ship.length} of its cells are hit!")
+        elif outcome.result == HIT:
+            await self.io.say(f"Spaceship hit at ({x_coordinate}, {y_coordinate}).")
+        elif outcome.extra_turn:
+            await self.io.say("Extra munitions found, take another guess!")
+        elif outcome.shooter is self.engine.player:
+            await self.io.say(f"You shot and found nothing at ({x_coordinate}, {y_coordinate}).")
+        else:
+            await self.io.say(f"Computer shot and found nothing at ({x_coordinate}, {y_coordinate}).")
+
+    def simulate(self, board_size, num_ships, on_shot=None):
+        """
+        Play a computer-vs-computer game with no input, sleeps or rendering.
+
+        Args:
+            board_size (int): The size of the game board.
+            num_ships (int): The number of spaceships each side places.
+            on_shot (callable, optional): Called with each ShotOutcome.
+
+        Returns:
+            GameEngine: The finished game.
+        """
+        player = User("Player", board_size, num_ships, self.rng)
+        computer = User("Computer", board_size, num_ships, self.rng)
+        self.place_computer_ships(player, num_ships, board_size)
+        self.place_computer_ships(computer, num_ships, board_size)
+        player.board.initialize_planets(board_size)
+        computer.board.initialize_planets(board_size)
+
+        self.num_ships = num_ships
+        self.engine = GameEngine(player, computer)
+        self.start_move_log()
+        while not self.engine.game_over:
+            target = self.engine.opponent(self.engine.turn)
+            x_coordinate, y_coordinate = self.computer_make_guess(board_size, target.board)
+            outcome = self.take_shot(x_coordinate, y_coordinate)
+            if on_shot is not None:
+                on_shot(outcome)
+        self.close_strategies()
+        self.stop_move_log()
+        return self.engine
+
+    def take_shot(self, x_coordinate, y_coordinate):
+        """
+        Fire the current user's shot and let the strategy firing at that board learn from it.
+
+        Args:
+            x_coordinate (int): The x-coordinate of the shot.
+            y_coordinate (int): The y-coordinate of the shot.
+
+        Returns:
+            ShotOutcome: The outcome of the shot.
+        """
+        target = self.engine.opponent(self.engine.turn)
+        outcome = self.engine.fire(x_coordinate, y_coordinate)
+        self.shots_at[target.board] = self.shots_at.get(target.board, 0) + 1
+        if self.move_log is not None:
+            self.move_log.record(outcome, self)
+        strategy = self.strategies.get(target.board)
+        if strategy is not None:
+            strategy.observe(outcome)
+        return outcome
+
+    def start_move_log(self, append=False):
+        """
+        Open the move log, if there is one, and checkpoint the game as it stands.
+
+        Args:
+            append (bool, optional): Whether the game is resumed and carries on
+                the log instead of starting it afresh.
+        """
+        if self.log_path is not None:
+            self.move_log = MoveLog(self.log_path, append=append)
+            self.move_log.checkpoint(self)
+
+    def stop_move_log(self):
+        """
+        Close the move log, if there is one.
+        """
+        if self.move_log is not None:
+            self.move_log.close()
+            self.move_log = None
+
+    def targeting(self, board):
+        """
+        Get the strategy firing at a board, creating it on first use.
+
+        Args:
+            board (Board): The board being fired at.
+
+        Returns:
+            RandomTargeting, HuntTargetAI or MonteCarloAI: The strategy.
+        """
+        if board not in self.strategies:
+            owner = self.engine.player if board is self.engine.player.board else self.engine.computer
+            name = self.ai if owner is self.engine.player else self.player_ai
+            fleet = [ship.length for ship in owner.ships if not ship.sunk]
+            strategy = TARGETING[name]
+            options = {key: value for key, value in self.ai_options.items() if key in strategy.options}
+            self.strategies[board] = strategy(board, fleet, self.rng, **options)
+            # After a resume, tell the strategy about the hits on spaceships still afloat
+            for ship in owner.ships:
+                if not ship.sunk and ship.remaining < ship.length:
+                    for x_coordinate, y_coordinate in ship.cells:
+                        if board.cell_code(x_coordinate, y_coordinate) == CELL_HIT:
+                            self.strategies[board].observe(ShotOutcome(None, x_coordinate, y_coordinate, HIT))
+        return self.strategies[board]
+
+    def close_strategies(self):
+        """
+        Release what the strategies hold, such as worker processes, once the game is over.
+        """
+        for strategy in self.strategies.values():
+            if hasattr(strategy, 'close'):
+                strategy.close()
+
+    def computer_make_guess(self, board_size, player_board):
+        """
+        Generate a guess for the computer.
+
+        Args:
+            board_size (int): The size of the game board.
+            player_board (Board): The player's game board.
+
+        Returns:
+            tuple: A tuple containing the x_coordinate and y_coordinate of the guess.
+        """
+        strategy = self.targeting(player_board)
+        if not METRICS.enabled:
+            return strategy.choose()
+        avoided_retries = getattr(strategy, 'avoided_retries', 0)
+        start = time.perf_counter()
+        guess = strategy.choose()
+        METRICS.observe(f'nebula_guess_seconds{{ai="{strategy.name}"}}', time.perf_counter() - start)
+        # Retries a guess-and-check loop would have made, the pool makes none
+        METRICS.count('nebula_guess_retries_avoided_total', getattr(strategy, 'avoided_retries', 0) - avoided_retries)
+        return guess
+
+    def speculative_guess(self, board):
+        """
+        Choose the computer's move at a board, holding back what it adds to the statistics.
+
+        Runs in a worker thread. The strategy's counters and decision times
+        are put back as they were, so a move that is thrown away leaves no
+        trace; count_speculation() adds them once the move is fired.
+
+        Args:
+            board (Board): The board the computer fires at.
+
+        Returns:
+            tuple: The guess, and the counters, decision times and seconds
+                the choice added.
+        """
+        strategy = self.strategies[board]
+        counters = {name: getattr(strategy, name) for name in STRATEGY_COUNTERS if hasattr(strategy, name)}
+        timed = len(strategy.decision_times)
+        start = time.perf_counter()
+        guess = strategy.choose()
+        elapsed = time.perf_counter() - start
+        added = {name: getattr(strategy, name) - value for name, value in counters.items()}
+        for name, value in counters.items():
+            setattr(strategy, name, value)
+        decision_times = strategy.decision_times[timed:]
+        del strategy.decision_times[timed:]
+        return guess, (added, decision_times, elapsed)
+
+    def count_speculation(self, board, held):
+        """
+        Add what a move chosen ahead held back to the statistics, now that it is fired.
+
+        Args:
+            board (Board): The board the move was chosen at.
+            held (tuple): The counters, decision times and seconds returned
+                by speculative_guess().
+        """
+        strategy = self.strategies[board]
+        added, decision_times, elapsed = held
+        for name, value in added.items():
+            setattr(strategy, name, getattr(strategy, name) + value)
+        strategy.decision_times.extend(decision_times)
+        if METRICS.enabled:
+            METRICS.observe(f'nebula_guess_seconds{{ai="{strategy.name}"}}', elapsed)
+            METRICS.count('nebula_guess_retries_avoided_total', added.get('avoided_retries', 0))
+
+    def start_speculation(self, board):
+        """
+        Start choosing the computer's next shot at a board in a worker thread.
+
+        The player's shot lands on the other board, so the move is normally
+        still right when the computer's turn comes. The shots observed at the
+        board are noted with it as a version, and the move is thrown away if
+        that has changed by the time it is needed. Choosing a move does not
+        change a strategy, and its statistics are only counted once it is
+        fired, so throwing it away costs nothing.
+
+        Args:
+            board (Board): The board the computer fires at.
+        """
+        if self.speculation is None and not self.engine.game_over:
+            self.targeting(board)  # Create the strategy here, not in the worker
+            future = asyncio.get_running_loop().run_in_executor(None, self.speculative_guess, board)
+            self.speculation = (board, self.shots_at.get(board, 0), future)
+
+    async def computer_move(self, board):
+        """
+        Get the computer's shot at a board, from the speculation if it is still valid.
+
+        Args:
+            board (Board): The board the computer fires at.
+
+        Returns:
+            tuple: The x_coordinate and y_coordinate of the shot.
+        """
+        if self.speculation is not None:
+            speculated_board, version, future = self.speculation
+            self.speculation = None
+            start = time.perf_counter()
+            guess, held = await future  # Only waits if the player answered before the move was ready
+            if speculated_board is board and version == self.shots_at.get(board, 0):
+                self.speculation_wait += time.perf_counter() - start
+                self.speculations_used += 1
+                self.count_speculation(board, held)
+                if METRICS.enabled:
+                    METRICS.count('nebula_speculative_moves_total{result="used"}')
+                return guess
+            self.speculations_discarded += 1
+            if METRICS.enabled:
+                METRICS.count('nebula_speculative_moves_total{result="discarded"}')
+        return self.computer_make_guess(board.size, board)
+
+    async def drop_speculation(self):
+        """
+        Discard a move chosen ahead that will not be fired, once its worker is done with the strategy.
+        """
+        if self.speculation is not None:
+            future = self.speculation[2]
+            self.speculation = None
+            self.speculations_discarded += 1
+            if METRICS.enabled:
+                METRICS.count('nebula_speculative_moves_total{result="discarded"}')
+            try:
+                await future
+            except Exception:  # Nobody wanted the move, nor its error
+                pass
+
+    def speculation_stats(self):
+        """
+        Summarise how often the computer's move was chosen while the player typed.
+
+        Returns:
+            str: A one-line report.
+        """
+        speculated = self.speculations_used + self.speculations_discarded
+        if not speculated:
+            return "No computer moves were chosen ahead."
+        return (f"Computer moves chosen while the player typed: {self.speculations_used} of {speculated} used, "
+                f"{self.speculations_discarded} discarded, "
+                f"{self.speculation_wait * 1000 / max(self.speculations_used, 1):.2f} ms waited per move used")
+
+    def place_computer_ships(self, computer, num_ships, board_size):
+        """
+        Place the computer's spaceships on the board.
+
+        Also used to place the spaceships of either side in a simulated game.
+
+        Args:
+            computer (User): The computer player.
+            num_ships (int): The number of spaceships to place.
+            board_size (int): The size of the game board.
+
+        Raises:
+            ValueError: If the fleet does not fit on the board.
+        """
+        for length in fleet_lengths(num_ships, board_size):
+            computer.ships.append(Ship(computer.name, computer.board.random_ship_cells(length)))
+            computer.board.place_ship(computer.ships[-1])
+
+
+class BatchGameRunner:
+    """
+    Plays many computer-vs-computer games at once for balancing runs.
+
+    Every board of every game lives in one stacked bytearray, indexed as
+    [game][side][cell] with side 0 the player and side 1 the computer. The
+    rules are the same as GameEngine: a hit or sink passes the turn, a planet
+    grants another shot, a miss passes the turn, and the first side to sink
+    every spaceship wins.
+
+    The random guesser never looks at where the spaceships lie, and a side
+    wins once every spaceship cell is hit, so only the number of spaceship
+    cells matters. They are scattered uniformly instead of laid out as
+    spaceships, and firing at the cells of a board in index order is then
+    distributed exactly like the random guesser drawing untried cells. That
+    lets each game be resolved with a few C-level bytearray scans over its
+    two boards instead of one Python step per shot.
+    """
+    def __init__(self, num_games, board_size, num_ships, num_planets=None, rng=None):
+        """
+        Initialize the runner.
+
+        Args:
+            num_games (int): The number of games to play.
+            board_size (int): The size of each game board.
+            num_ships (int): The number of spaceships each side places.
+            num_planets (int, optional): The number of planets on each board.
+                Defaults to the board size, as in play().
+            rng (random.Random, optional): The random number generator for the
+                layouts. Defaults to the global random module.
+
+        Raises:
+            ValueError: If the spaceships and planets do not fit on a board.
+        """
+        self.num_games = num_games
+        self.rng = rng or random
+        self.board_size = board_size
+        self.num_ships = num_ships
+        self.ship_cells = sum(fleet_lengths(num_ships, board_size))  # Cells each fleet covers
+        self.num_planets = board_size if num_planets is None else num_planets
+        self.area = board_size * board_size
+        if self.ship_cells + self.num_planets > self.area:
+            raise ValueError(f"Cannot place {self.num_ships} spaceships and {self.num_planets} planets "
+                             f"on the {board_size}x{board_size} board.")
+        self.boards = bytearray(num_games * 2 * self.area)  # Stacked [game][side][cell] grid
+        self.rounds = [0] * num_games  # Shots fired in each game
+        self.winners = bytearray(num_games)  # 0 if the player won, 1 if the computer won
+
+    def setup(self):
+        """
+        Scatter the spaceship cells and planets of every board in the stack.
+        """
+        area, ship_cells = self.area, self.ship_cells
+        objects = ship_cells + self.num_planets
+        for base in range(0, len(self.boards), area):
+            cells = self.rng.sample(range(base, base + area), objects)
+            for cell in cells[:ship_cells]:
+                self.boards[cell] = CELL_SHIP
+            for cell in cells[ship_cells:]:
+                self.boards[cell] = CELL_PLANET
+
+    def _shots_for_turns(self, base, turns):
+        """
+        Count the shots a side fires in its first turns.
+
+        Args:
+            base (int): The offset of the board being shot at.
+            turns (int): The number of turns taken.
+
+        Returns:
+            int: The number of shots, including extra shots from planets.
+        """
+        shots = turns
+        while True:  # Each planet found adds a shot to the turn it was found in
+            needed = turns + self.boards.count(CELL_PLANET, base, base + shots)
+            if needed == shots:
+                return shots
+            shots = needed
+
+    def run(self):
+        """
+        Play every game in the batch to the end.
+
+        Returns:
+            tuple: The list of rounds played per game and a bytearray with the
+                winner of each game, 0 for the player and 1 for the computer.
+        """
+        self.setup()
+        boards, area = self.boards, self.area
+        for game in range(self.num_games):
+            sinking_shots = []  # Shots each side needs to sink the last spaceship
+            sinking_turns = []  # Turns each side needs to sink the last spaceship
+            for side in (0, 1):
+                base = (game * 2 + 1 - side) * area  # Each side shoots at the other board
+                shots = boards.rfind(CELL_SHIP, base, base + area) - base + 1
+                sinking_shots.append(shots)
+                sinking_turns.append(shots - boards.count(CELL_PLANET, base, base + shots))
+
+            if sinking_turns[0] <= sinking_turns[1]:  # The player shoots first
+                computer_shots = self._shots_for_turns(game * 2 * area, sinking_turns[0] - 1)
+                self.rounds[game] = sinking_shots[0] + computer_shots
+                self.winners[game] = 0
+            else:
+                player_shots = self._shots_for_turns((game * 2 + 1) * area, sinking_turns[1])
+                self.rounds[game] = player_shots + sinking_shots[1]
+                self.winners[game] = 1
+        return self.rounds, self.winners
+
+
+async def display_win_art(io=None):
+    """
+    Display a winning message in ASCII art.
+
+    Args:
+        io (ConsoleIO or StreamIO, optional): Where the player is. Defaults to the terminal.
+    """
+    # Win text art generated from picsart see readme for more info
+    win_art = r"""
+     __        ___                       _
+     \ \      / (_)_ __  _ __   ___ _ __| |
+      \ \ /\ / /| | '_ \| '_ \ / _ \ '__| |
+       \ V  V / | | | | | | | |  __/ |  |_|
+        \_/\_/  |_|_| |_|_| |_|\___|_|  (_)
+    """
+    await (io or ConsoleIO()).show(win_art)
+
+
+async def display_loss_art(io=None):
+    """
+    Display a losing message in ASCII art.
+
+    Args:
+        io (ConsoleIO or StreamIO, optional): Where the player is. Defaults to the terminal.
+    """
+    # Win text art generated from picsart see readme for more info
+    loss_art = r"""
+       ____                         ___                   _
+      / ___| __ _ _ __ ___   ___   / _ \__   _____ _ __  | |
      | |  _ / _` | '_ ` _ \ / _ \ | | | \ \ / / _ \ '__| | |
      | |_| | (_| | | | | | |  __/ | |_| |\ V /  __/ |    |_|
       \____|\__,_|_| |_| |_|\___|  \___/  \_/ \___|_|    (_)
     """
-    print(loss_art)
+    await (io or ConsoleIO()).show(loss_art)
+
+
+def run_batch_simulation(num_games, board_size, num_ships):
+    """
+    Play computer-vs-computer games with BatchGameRunner and report throughput.
+
+    Args:
+        num_games (int): The number of games to play.
+        board_size (int): The size of each game board.
+        num_ships (int): The number of spaceships each side places.
+
+    Returns:
+        dict: The number of wins per side, total rounds and games per second.
+    """
+    start = time.perf_counter()
+    rounds, winners = BatchGameRunner(num_games, board_size, num_ships).run()
+    elapsed = time.perf_counter() - start
+    games_per_second = num_games / elapsed if elapsed else float('inf')
+    computer_wins = sum(winners)
+    wins = {"Player": num_games - computer_wins, "Computer": computer_wins}
+
+    print(f"Batch simulated {num_games} games on a {board_size}x{board_size} board "
+          f"with {num_ships} spaceships in {elapsed:.2f}s "
+          f"({games_per_second:.0f} games/sec, {games_per_second * 60:.0f} games/min)")
+    print(f"Player wins: {wins['Player']}, Computer wins: {wins['Computer']}, "
+          f"average rounds: {sum(rounds) / max(num_games, 1):.1f}")
+    return {"wins": wins, "rounds": sum(rounds), "games_per_second": games_per_second}
+
+
+def run_simulation(num_games, board_size, num_ships, ai='random', player_ai='random', ai_options=None):
+    """
+    Play computer-vs-computer games at machine speed and report throughput.
+
+    Args:
+        num_games (int): The number of games to play.
+        board_size (int): The size of each game board.
+        num_ships (int): The number of spaceships each side places.
+        ai (str, optional): The TARGETING strategy of the computer.
+        player_ai (str, optional): The TARGETING strategy playing for the player.
+        ai_options (dict, optional): Options passed to the strategies, see SpaceshipGame.
+
+    Returns:
+        dict: The number of wins per side, total rounds, games per second,
+            guess retries avoided, move latencies per side and Monte Carlo
+            layouts sampled per second per side.
+    """
+    wins = {"Player": 0, "Computer": 0}
+    total_rounds = 0
+    avoided_retries = 0
+    decision_times = {"Player": [], "Computer": []}
+    samples_drawn = {"Player": 0, "Computer": 0}
+    start = time.perf_counter()
+    for _ in range(num_games):
+        game = SpaceshipGame(ai=ai, player_ai=player_ai, ai_options=ai_options)
+        engine = game.simulate(board_size, num_ships)
+        wins[engine.winner.name] += 1
+        total_rounds += engine.rounds_played
+        avoided_retries += game.avoided_retries
+        for board, strategy in game.strategies.items():
+            side = "Computer" if board is engine.player.board else "Player"
+            decision_times[side].extend(strategy.decision_times)
+            samples_drawn[side] += getattr(strategy, 'samples_drawn', 0)
+    elapsed = time.perf_counter() - start
+    games_per_second = num_games / elapsed if elapsed else float('inf')
+
+    print(f"Simulated {num_games} games on a {board_size}x{board_size} board "
+          f"with {num_ships} spaceships in {elapsed:.2f}s ({games_per_second:.0f} games/sec)")
+    print(f"Player wins: {wins['Player']}, Computer wins: {wins['Computer']}, "
+          f"average rounds: {total_rounds / max(num_games, 1):.1f}")
+    print(f"Guess retries avoided: {avoided_retries:.0f} "
+          f"({avoided_retries / max(total_rounds, 1):.1f} per shot)")
+    latencies = {}
+    samples_per_second = {}
+    for side, strategy in (("Player", player_ai), ("Computer", ai)):
+        times = sorted(decision_times[side])
+        if times:
+            latencies[side] = {"mean": sum(times) / len(times), "p99": times[len(times) * 99 // 100],
+                               "max": times[-1]}
+            print(f"{side} ({strategy}) move latency: mean {latencies[side]['mean'] * 1000:.3f} ms, "
+                  f"p99 {latencies[side]['p99'] * 1000:.3f} ms, max {latencies[side]['max'] * 1000:.3f} ms")
+        if samples_drawn[side]:
+            samples_per_second[side] = samples_drawn[side] / sum(times)
+            print(f"{side} ({strategy}) sampled {samples_drawn[side]} layouts "
+                  f"({samples_per_second[side]:.0f} layouts/sec)")
+    return {"wins": wins, "rounds": total_rounds, "games_per_second": games_per_second,
+            "avoided_retries": avoided_retries, "latencies": latencies,
+            "samples_per_second": samples_per_second}
+
+
+def play_tournament_game(seed, board_size, num_ships, ai='random', player_ai='random', ai_options=None):
+    """
+    Play one seeded computer-vs-computer tournament game.
+
+    The game draws every random number from its own random.Random(seed), so
+    the same seed always replays the same game.
+
+    Args:
+        seed (int): The seed of the game.
+        board_size (int): The size of the game board.
+        num_ships (int): The number of spaceships each side places.
+        ai (str, optional): The TARGETING strategy of the computer.
+        player_ai (str, optional): The TARGETING strategy playing for the player.
+        ai_options (dict, optional): Options passed to the strategies, see SpaceshipGame.
+
+    Returns:
+        tuple: The seed, the name of the winner and the rounds played.
+    """
+    game = SpaceshipGame(random.Random(seed), ai=ai, player_ai=player_ai, ai_options=ai_options)
+    engine = game.simulate(board_size, num_ships)
+    return seed, engine.winner.name, engine.rounds_played
+
+
+def replay_tournament_game(seed, board_size, num_ships, ai='random', player_ai='random', ai_options=None):
+    """
+    Replay a tournament game from its seed, printing every shot.
+
+    Only games between untimed strategies replay exactly, a timed strategy
+    may weigh more or fewer cells than it did in the tournament.
+
+    Args:
+        seed (int): The seed of the game.
+        board_size (int): The size of the game board.
+        num_ships (int): The number of spaceships each side places.
+        ai (str, optional): The TARGETING strategy of the computer.
+        player_ai (str, optional): The TARGETING strategy playing for the player.
+        ai_options (dict, optional): Options passed to the strategies, see SpaceshipGame.
+
+    Returns:
+        GameEngine: The finished game.
+    """
+    def print_shot(outcome):
+        print(f"{outcome.shooter.name} fired at ({outcome.x_coordinate}, {outcome.y_coordinate}): {outcome.result}")
+
+    game = SpaceshipGame(random.Random(seed), ai=ai, player_ai=player_ai, ai_options=ai_options)
+    engine = game.simulate(board_size, num_ships, print_shot)
+    print(f"Seed {seed}: {engine.winner.name} won in {engine.rounds_played} rounds")
+    return engine
+
+
+def replay_move_log(path, turn=None):
+    """
+    Print the shots of a move log, or both boards as they stood after a turn.
 
+    Args:
+        path (str): The move log.
+        turn (int, optional): The turn to show the boards at. Defaults to
+            streaming every shot.
+    """
+    if turn is None:
+        for shot_turn, shooter, x_coordinate, y_coordinate, result in replay_moves(path):
+            print(f"{shot_turn}: {shooter} fired at ({x_coordinate}, {y_coordinate}): {result}")
+        return
+    engine = load_move_log(path, turn).engine
+    next_up = f"{engine.winner.name} won" if engine.game_over else f"{engine.turn.name} to fire next"
+    print(f"After turn {engine.rounds_played}, {next_up}")
+    for user in (engine.player, engine.computer):
+        print(f"{user.name}'s Board (sunk {user.score} of the opponent's spaceships):")
+        print('\n'.join(user.board.render_lines(hide_ships=False)))
+
+
+def run_tournament(num_games, board_size, num_ships, workers=None, seed=None, ai='random', player_ai='random',
+                   ai_options=None):
+    """
+    Play seeded games across a process pool and aggregate the results.
+
+    Game i is seeded with seed + i, results are streamed back from the
+    workers as they finish and folded into the totals.
+
+    Args:
+        num_games (int): The number of games to play.
+        board_size (int): The size of each game board.
+        num_ships (int): The number of spaceships each side places.
+        workers (int, optional): The number of worker processes. Defaults to the CPU count.
+        seed (int, optional): The seed of the first game. Defaults to a random seed.
+        ai (str, optional): The TARGETING strategy of the computer.
+        player_ai (str, optional): The TARGETING strategy playing for the player.
+        ai_options (dict, optional): Options passed to the strategies, see SpaceshipGame.
+
+    Returns:
+        dict: Win rates, round distribution, wall time and the seed range.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    workers = workers or os.cpu_count() or 1
+    wins = {"Player": 0, "Computer": 0}
+    rounds = []
+    longest = None  # Seed and rounds of the longest game
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, num_games // (workers * 16))
+        results = executor.map(play_tournament_game, range(seed, seed + num_games),
+                               itertools.repeat(board_size), itertools.repeat(num_ships),
+                               itertools.repeat(ai), itertools.repeat(player_ai), itertools.repeat(ai_options),
+                               chunksize=chunksize)
+        for game_seed, winner, game_rounds in results:
+            wins[winner] += 1
+            rounds.append(game_rounds)
+            if longest is None or game_rounds > longest[1]:
+                longest = (game_seed, game_rounds)
+    elapsed = time.perf_counter() - start
+
+    rounds.sort()
+    distribution = {f"p{pct}": rounds[min(len(rounds) - 1, len(rounds) * pct // 100)]
+                    for pct in (0, 10, 50, 90, 99, 100)}
+    win_rates = {name: count / num_games for name, count in wins.items()}
+    print(f"Tournament of {num_games} games on a {board_size}x{board_size} board with {num_ships} "
+          f"spaceships, seeds {seed}..{seed + num_games - 1}, {workers} workers")
+    print(f"Wall time {elapsed:.2f}s ({num_games / elapsed:.0f} games/sec)")
+    print(f"Win rates: Player {win_rates['Player']:.1%}, Computer {win_rates['Computer']:.1%}")
+    print("Rounds: " + ", ".join(f"{name} {value}" for name, value in distribution.items()))
+    timed = sorted({name for name in (ai, player_ai) if TARGETING[name].timed})
+    if timed:  # How far a timed strategy gets depends on the machine, so its games cannot be replayed
+        print(f"Longest game: seed {longest[0]} ({longest[1]} rounds), cannot be replayed exactly: "
+              f"the {' and '.join(timed)} {'strategies stop' if len(timed) > 1 else 'strategy stops'} "
+              f"at a time budget")
+    else:
+        print(f"Longest game: seed {longest[0]} ({longest[1]} rounds), "
+              f"replay with: run.py tournament --replay {longest[0]}")
+    return {"wins": wins, "win_rates": win_rates, "rounds": distribution,
+            "wall_time": elapsed, "seed": seed, "workers": workers}
+
+
+# Connections the game server lets queue while it accepts, players tend to arrive together
+SERVER_BACKLOG = 1024
+
+
+class GameServer:
+    """
+    Hosts many games in one process, one coroutine per connected player.
+
+    Players connect over TCP and play the same game as in the terminal, a
+    line of input at a time. Every prompt and pause awaits the connection, so
+    the event loop runs the other games while a player thinks, and a session
+    costs its boards and a coroutine instead of a whole interpreter.
+    """
+    def __init__(self, args, trace_memory=False):
+        """
+        Initialize the server.
+
+        Args:
+            args (argparse.Namespace): The command line, for the text mode and AI options.
+            trace_memory (bool, optional): Trace allocations to report the memory
+                held per session. Slows every session down.
+        """
+        self.args = args
+        self.trace_memory = trace_memory
+        self.active = 0  # Sessions connected now
+        self.peak = 0  # Most sessions connected at once
+        self.served = 0  # Sessions finished
+        self.speculations_used = 0  # Computer moves of finished sessions chosen ahead and fired
+        self.speculations_discarded = 0  # Computer moves of finished sessions chosen ahead and thrown away
+        self.baseline_memory = 0  # Bytes traced before the first session
+
+    async def handle(self, reader, writer):
+        """
+        Run one player's session from the title screen to the end of the game.
+
+        Args:
+            reader (asyncio.StreamReader): Lines typed by the player.
+            writer (asyncio.StreamWriter): Output to the player.
+        """
+        io = StreamIO(reader, writer, self.args.text_mode, self.args.text_delay)
+        game = None
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            title_screen = TitleScreen()
+            await title_screen.display(io)
+            if title_screen.play_game:
+                game = SpaceshipGame(ai=self.args.ai, ai_options=self.args.ai_options, io=io,
+                                     speculate=self.args.speculate, max_board_size=self.args.max_size)
+                await game.play()
+            else:
+                await io.say("Goodbye!")
+        except (EOFError, ConnectionError):
+            pass  # The player left mid-game
+        finally:
+            if game is not None:
+                await game.drop_speculation()
+                game.close_strategies()
+                self.speculations_used += game.speculations_used
+                self.speculations_discarded += game.speculations_discarded
+            self.active -= 1
+            self.served += 1
+            writer.close()
+            print(self.stats(), flush=True)
+
+    def stats(self):
+        """
+        Summarise the sessions held by the process.
+
+        Returns:
+            str: A one-line report of sessions and, when traced, memory per session.
+        """
+        report = f"{self.active} sessions active, peak {self.peak}, {self.served} finished"
+        speculated = self.speculations_used + self.speculations_discarded
+        if speculated:
+            report += f", {self.speculations_used}/{speculated} computer moves chosen ahead were used"
+        if self.trace_memory and self.active:
+            per_session = (tracemalloc.get_traced_memory()[0] - self.baseline_memory) / self.active
+            report += f", {per_session / 1024:.1f} KiB traced per active session"
+        return report
+
+    async def serve(self, host, port):
+        """
+        Accept players until interrupted.
+
+        Args:
+            host (str): The address to listen on.
+            port (int): The port to listen on.
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+            self.baseline_memory = tracemalloc.get_traced_memory()[0]
+        server = await asyncio.start_server(self.handle, host, port, backlog=SERVER_BACKLOG)
+        print(f"Serving Nebula Battlefront on {host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def warm_up():
+    """
+    Do the one-off work of a game up front, so forked sessions start ready.
+
+    Imports what the game loads lazily, runs the argument parser and builds
+    and draws a board once, then freezes the objects so far out of the
+    garbage collector, so the forked children keep sharing their pages.
+    """
+    concurrent.futures.ProcessPoolExecutor  # The pool module is imported on first use
+    asyncio.new_event_loop().close()
+    parse_args([])
+    TitleScreen()
+    board = Board(10, random.Random(0))
+    board.initialize_planets(10)
+    board.render_view(True, 10, 80)
+    gc.collect()
+    gc.freeze()
+
+
+def serve_zygote_session(conn):
+    """
+    Run one game in a forked child on the terminal sent by attach.py, then exit.
+
+    Receives the argument list and the stdin, stdout and stderr descriptors
+    of the attach.py process, takes them over as its own, sends back its pid
+    so signals can be forwarded, runs main() and sends back the exit status.
+
+    Args:
+        conn (socket.socket): The connection from attach.py.
+    """
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)  # The zygote ignores its children, games wait for theirs
+    status = 1
+    try:
+        message, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        # Rebuild the standard streams over the new descriptors, line buffered like a terminal
+        sys.stdin = sys.__stdin__ = open(0, 'r', closefd=False)
+        sys.stdout = sys.__stdout__ = open(1, 'w', buffering=1, closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, 'w', buffering=1, closefd=False)
+        OUTPUT.stream, OUTPUT.input_stream = sys.stdout, sys.stdin
+        conn.sendall(struct.pack('!i', os.getpid()))
+        argv = [arg.decode('utf-8') for arg in message.split(b'\0')] if message else []
+        try:
+            main(argv)
+            status = 0
+        except SystemExit as error:
+            status = error.code if isinstance(error.code, int) else 1
+        except (EOFError, KeyboardInterrupt, OSError):
+            status = 1  # The terminal went away or the player interrupted
+        sys.stdout.flush()
+        conn.sendall(struct.pack('!i', status))
+    finally:
+        os._exit(status)
+
+
+def run_zygote(path, pool=0):
+    """
+    Launch games for attach.py from a warm process, one forked child per game.
 
-def main():
+    Listens on a Unix socket. With no pool, a child is forked when a
+    connection arrives. With a pool, that many idle children wait on the
+    socket already forked, and each one that takes a connection is replaced.
+
+    Args:
+        path (str): The path of the Unix socket to listen on.
+        pool (int, optional): Idle children kept forked. Defaults to 0.
+    """
+    warm_up()
+    if os.path.exists(path):
+        os.unlink(path)  # Left behind by an earlier launcher
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(SERVER_BACKLOG)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # Finished games are reaped by the kernel
+    print(f"Zygote listening on {path} with {pool} pre-forked children", flush=True)
+
+    if not pool:
+        while True:
+            conn, _ = listener.accept()
+            if os.fork() == 0:
+                listener.close()
+                serve_zygote_session(conn)
+            conn.close()
+
+    taken, taken_signal = os.pipe()  # Idle children write a byte here when they take a connection
+    idle = 0
+    while True:
+        while idle < pool:
+            if os.fork() == 0:
+                os.close(taken)
+                conn, _ = listener.accept()
+                os.write(taken_signal, b'.')
+                os.close(taken_signal)
+                listener.close()
+                serve_zygote_session(conn)
+            idle += 1
+        idle -= len(os.read(taken, pool))
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line arguments.
+
+    Args:
+        argv (list of str, optional): The arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    # Options shared with the subcommands, defaults are filled in after parsing
+    game_options = argparse.ArgumentParser(add_help=False)
+    game_options.add_argument("--board-size", type=int, default=argparse.SUPPRESS,
+                              help="board size for simulated games (default: 10)")
+    game_options.add_argument("--ships", type=int, default=argparse.SUPPRESS,
+                              help="spaceships per side for simulated games (default: 5)")
+    game_options.add_argument("--ai", choices=sorted(TARGETING), default=argparse.SUPPRESS,
+                              help="computer opponent: random guesses, hunt/target heatmap or "
+                                   "Monte Carlo layout sampling (default: random)")
+    game_options.add_argument("--player-ai", choices=sorted(TARGETING), default=argparse.SUPPRESS,
+                              help="strategy playing for the player in simulated games (default: random)")
+    game_options.add_argument("--ai-budget", type=float, default=argparse.SUPPRESS, metavar="SECONDS",
+                              help="time allowed per move for the hunt and montecarlo AIs "
+                                   "(default: 0.005 for hunt, 0.05 for montecarlo)")
+    game_options.add_argument("--ai-workers", type=int, default=argparse.SUPPRESS, metavar="N",
+                              help="extra processes sampling layouts for the montecarlo AI (default: 0)")
+
+    parser = argparse.ArgumentParser(description="Nebula Battlefront", parents=[game_options])
+    parser.add_argument("--simulate", type=int, metavar="N",
+                        help="play N computer-vs-computer games headless and report games/sec")
+    parser.add_argument("--batch", action="store_true",
+                        help="run the simulated games with the batch runner")
+    parser.add_argument("--text-mode", choices=TextOutput.MODES, default="animate",
+                        help="how messages are written: at once, by word, by line or "
+                             "animated and skippable with any key (default: animate)")
+    parser.add_argument("--text-delay", type=float, default=0.05,
+                        help="seconds per character, word or line (default: 0.05)")
+    parser.add_argument("--render-stats", action="store_true",
+                        help="report the bytes sent to draw the boards, and how often the computer's move "
+                             "was ready before the player's, after the game")
+    parser.add_argument("--no-speculate", dest="speculate", action="store_false",
+                        help="choose the computer's move only once the player has fired, not while they type")
+    parser.add_argument("--serve", type=int, nargs="?", const=8023, metavar="PORT",
+                        help="host games for players connecting over TCP, all in this process (port 8023 if omitted)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address --serve listens on (default: 127.0.0.1)")
+    parser.add_argument("--max-size", type=int, default=SERVER_MAX_SIZE,
+                        help=f"with --serve, the largest board a player may ask for (default: {SERVER_MAX_SIZE})")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="with --serve, report the memory traced per session")
+    parser.add_argument("--save", metavar="PATH",
+                        help="save the game after every turn, to carry on with --resume after a crash")
+    parser.add_argument("--resume", metavar="PATH",
+                        help="carry on a game saved with --save, and keep saving it there")
+    parser.add_argument("--log", metavar="PATH",
+                        help="append every shot to a move log, for the replay command")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="time the hot paths and write the histograms to PATH at the end, "
+                             "or whenever the process gets SIGUSR1")
+    parser.add_argument("--metrics-format", choices=("json", "prometheus"), default="json",
+                        help="format of the --metrics file (default: json)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="run under cProfile, save the stats to PATH and print the slowest calls")
+    parser.add_argument("--zygote", metavar="SOCKET",
+                        help="launch a game per attach.py connection on this Unix socket, "
+                             "forked from one warm process")
+    parser.add_argument("--pool", type=int, default=0,
+                        help="with --zygote, idle children kept forked ahead of connections (default: 0)")
+    commands = parser.add_subparsers(dest="command")
+    tournament = commands.add_parser("tournament", parents=[game_options],
+                                     help="play seeded computer-vs-computer games across all cores")
+    tournament.add_argument("--games", type=int, default=1000,
+                            help="number of games to play (default: 1000)")
+    tournament.add_argument("--workers", type=int,
+                            help="worker processes (default: one per CPU)")
+    tournament.add_argument("--seed", type=int,
+                            help="seed of the first game, game i uses seed + i (default: random)")
+    tournament.add_argument("--replay", type=int, metavar="SEED",
+                            help="replay the single game with this seed shot by shot")
+    replay = commands.add_parser("replay", help="stream the shots of a move log or show the game at a turn")
+    replay.add_argument("log", metavar="LOG", help="move log written with --log")
+    replay.add_argument("--turn", type=int,
+                        help="show both boards as they stood after this turn, found from the nearest checkpoint")
+    args = parser.parse_args(argv)
+    args.board_size = getattr(args, "board_size", 10)
+    args.ships = getattr(args, "ships", 5)
+    args.ai = getattr(args, "ai", "random")
+    args.player_ai = getattr(args, "player_ai", "random")
+    args.ai_options = {}  # Only what was given, so each strategy keeps its own defaults
+    if hasattr(args, "ai_budget"):
+        args.ai_options["budget"] = args.ai_budget
+    if hasattr(args, "ai_workers"):
+        args.ai_options["workers"] = args.ai_workers
+    if args.board_size < 5:
+        parser.error("--board-size must be at least 5")
+    if args.ai_options.get("budget", 1) <= 0:
+        parser.error("--ai-budget must be positive")
+    if args.ai_options.get("workers", 0) < 0:
+        parser.error("--ai-workers must not be negative")
+    if args.pool < 0:
+        parser.error("--pool must not be negative")
+    if args.max_size < 5:
+        parser.error("--max-size must be at least 5")
+    if getattr(args, "games", 1) < 1:
+        parser.error("--games must be at least 1")
+    if (getattr(args, "workers", None) or 1) < 1:
+        parser.error("--workers must be at least 1")
+    if args.batch and (args.ai, args.player_ai) != ('random', 'random'):
+        parser.error("--batch only plays random strategies, drop --ai and --player-ai")
+    if not 5 <= args.ships <= max_fleet_ships(args.board_size):
+        parser.error(f"--ships must be between 5 and {max_fleet_ships(args.board_size)} on this board size")
+    return args
+
+
+def main(argv=None):
     """
     Define the main function to run the game.
+
+    Args:
+        argv (list of str, optional): The command line arguments. Defaults to sys.argv.
+    """
+    args = parse_args(argv)
+    if args.metrics is not None:
+        METRICS.enabled = True
+        if hasattr(signal, 'SIGUSR1'):  # Dump on demand from a running game or server
+            signal.signal(signal.SIGUSR1, lambda signum, frame: METRICS.dump(args.metrics, args.metrics_format))
+    profiler = None
+    if args.profile is not None:
+        import cProfile  # Only loaded when profiling, to keep start-up fast
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run_command(args)
+    finally:
+        if profiler is not None:
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved to {args.profile}, the slowest calls:")
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        if METRICS.enabled:
+            METRICS.dump(args.metrics, args.metrics_format)
+
+
+def run_command(args):
+    """
+    Run the game or the tool picked on the command line.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
     """
+    if args.command == "replay":
+        try:
+            replay_move_log(args.log, args.turn)
+        except (OSError, ValueError) as error:
+            sys.exit(f"Cannot replay {args.log}: {error}")
+        return
+    if args.command == "tournament" and args.replay is not None:
+        replay_tournament_game(args.replay, args.board_size, args.ships, args.ai, args.player_ai, args.ai_options)
+        return
+    if args.command == "tournament":
+        run_tournament(args.games, args.board_size, args.ships, args.workers, args.seed,
+                       args.ai, args.player_ai, args.ai_options)
+        return
+    if args.simulate is not None and args.batch:
+        run_batch_simulation(args.simulate, args.board_size, args.ships)
+        return
+    if args.simulate is not None:
+        run_simulation(args.simulate, args.board_size, args.ships, args.ai, args.player_ai, args.ai_options)
+        return
+
+    if args.zygote is not None:
+        run_zygote(args.zygote, args.pool)
+        return
+    if args.serve is not None:
+        server = GameServer(args, args.trace_memory)
+        try:
+            asyncio.run(server.serve(args.host, args.serve))
+        except KeyboardInterrupt:
+            print(server.stats())
+        return
+
+    snapshot = None
+    if args.resume is not None:
+        try:
+            with open(args.resume, 'rb') as file:
+                snapshot = file.read()
+            SpaceshipGame().restore(snapshot)  # Fail before the title screen, not after it
+        except (OSError, ValueError) as error:
+            sys.exit(f"Cannot resume from {args.resume}: {error}")
+
+    OUTPUT.mode = args.text_mode
+    OUTPUT.delay = args.text_delay
     title_screen = TitleScreen()
-    title_screen.display()
+    asyncio.run(title_screen.display())
     if title_screen.play_game:
-        game = SpaceshipGame()
-        game.play()
+        game = SpaceshipGame(ai=args.ai, ai_options=args.ai_options, save_path=args.save or args.resume,
+                             log_path=args.log, speculate=args.speculate)
+        asyncio.run(game.play(snapshot))
+        if args.render_stats:
+            print(game.renderer.stats())
+            print(game.speculation_stats())
     else:
         typewriter_effect("Goodbye!")
 